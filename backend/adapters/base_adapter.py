@@ -1,6 +1,6 @@
 ﻿from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict
 from backend.core.types import LLMRequest, LLMResponse
 
 class BaseAdapter(ABC):
@@ -15,8 +15,18 @@ class BaseAdapter(ABC):
     async def generate(self, req: LLMRequest, **kwargs: Any) -> LLMResponse:
         """
         Return a structured LLMResponse for the given request.
+        schema=<JSON Schema dict> asks for JSON output; providers without structured
+        outputs ignore it (the schema is in the prompt as well).
         """
         raise NotImplementedError
 
+    async def generate_stream(self, req: LLMRequest, **kwargs: Any) -> AsyncIterator[str]:
+        """
+        Yield text deltas as the provider produces them.
+        Default: a single chunk from generate(); providers override with native streaming.
+        """
+        resp = await self.generate(req, **kwargs)
+        yield resp.text
+
     async def health(self) -> Dict[str, Any]:
         return {"status": "ok", "model": self.model}
@@ -1,40 +1,85 @@
 ﻿from __future__ import annotations
 import os
-from typing import Any
+from typing import Any, AsyncIterator, Dict, Optional
 import httpx
+import orjson
 from backend.adapters.base_adapter import BaseAdapter
 from backend.core.types import LLMRequest, LLMResponse
 
 class ClaudeAdapter(BaseAdapter):
     name = "claude"
 
-    def __init__(self, model: str = "claude-3-opus-20240229"):
+    # Fallback pool for adapters built without an injected client (e.g., scripts/tests).
+    _client: Optional[httpx.AsyncClient] = None
+
+    def __init__(self, model: str = "claude-3-opus-20240229", client: Optional[httpx.AsyncClient] = None):
         self.api_key = os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise RuntimeError("ANTHROPIC_API_KEY not set in environment")
         self.model = model
         self.endpoint = "https://api.anthropic.com/v1/messages"
-
-    async def generate(self, req: LLMRequest, **kwargs: Any) -> LLMResponse:
-        """
-        Calls Anthropic Claude API and returns LLMResponse.
-        """
-        headers = {
+        # App-level client (see backend/api/index.py lifespan); the adapter doesn't own it
+        self.http = client
+        self.headers = {
             "x-api-key": self.api_key,
             "anthropic-version": "2023-06-01",
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
         }
-        payload = {
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """
+        Injected client if any, else a lazily built class-wide HTTP/2 pool.
+        """
+        if self.http is not None:
+            return self.http
+        cls = type(self)
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(60.0),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+        return cls._client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """
+        Close the fallback client (called from the app shutdown hook).
+        """
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    def _payload(self, req: LLMRequest) -> Dict[str, Any]:
+        """
+        Anthropic takes system text as a top-level field, not a message role.
+        System blocks are marked cache_control=ephemeral so a stable prefix is reused across calls.
+        """
+        system = [
+            {"type": "text", "text": m.content, "cache_control": {"type": "ephemeral"}}
+            for m in req.messages if m.role == "system"
+        ]
+        payload: Dict[str, Any] = {
             "model": self.model,
             "max_tokens": req.max_tokens or 256,
             "temperature": req.temperature,
-            "messages": [m.model_dump() for m in req.messages],
+            "messages": [m.as_dict for m in req.messages if m.role != "system"],
         }
+        if system:
+            payload["system"] = system
+        return payload
 
-        async with httpx.AsyncClient(timeout=60) as client:
-            r = await client.post(self.endpoint, headers=headers, json=payload)
-            r.raise_for_status()
-            data = r.json()
+    async def generate(self, req: LLMRequest, **kwargs: Any) -> LLMResponse:
+        """
+        Calls Anthropic Claude API and returns LLMResponse.
+        """
+        payload = self._payload(req)
+
+        client = await self._get_client()
+        # orjson emits bytes directly; skips httpx's internal json.dumps
+        r = await client.post(self.endpoint, headers=self.headers, content=orjson.dumps(payload))
+        r.raise_for_status()
+        data = orjson.loads(r.content)
 
         text = data["content"][0]["text"]
         return LLMResponse(
@@ -43,3 +88,24 @@ class ClaudeAdapter(BaseAdapter):
             model_name=self.model,
             finish_reason=None,
         )
+
+    async def generate_stream(self, req: LLMRequest, **kwargs: Any) -> AsyncIterator[str]:
+        """
+        Streams text deltas from the Anthropic Messages API (SSE).
+        """
+        payload = {**self._payload(req), "stream": True}
+
+        client = await self._get_client()
+        async with client.stream(
+            "POST", self.endpoint, headers=self.headers, content=orjson.dumps(payload)
+        ) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = orjson.loads(line[5:])
+                if event.get("type") != "content_block_delta":
+                    continue
+                delta = event.get("delta") or {}
+                if delta.get("type") == "text_delta" and delta.get("text"):
+                    yield delta["text"]
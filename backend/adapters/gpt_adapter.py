@@ -1,31 +1,96 @@
 ﻿from __future__ import annotations
+import asyncio
 import os
-from typing import Any
+import random
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
 from openai import AsyncOpenAI, APIError, APIConnectionError, RateLimitError, AuthenticationError
 from backend.adapters.base_adapter import BaseAdapter
 from backend.core.types import LLMRequest, LLMResponse
 
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+
+def _as_runtime_error(e: Exception) -> RuntimeError:
+    if isinstance(e, RateLimitError):
+        return RuntimeError(f"Rate limit exceeded: {e}")
+    if isinstance(e, AuthenticationError):
+        return RuntimeError(f"Authentication failed: {e}")
+    if isinstance(e, APIConnectionError):
+        return RuntimeError(f"Connection error: {e}")
+    if isinstance(e, APIError):
+        return RuntimeError(f"OpenAI API error: {e}")
+    return RuntimeError(f"Unexpected error: {e}")
+
+def _response_format(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Structured-output response_format for a JSON Schema: the reply is a bare JSON object (no fences/prose).
+    Non-strict, since strict mode would force every optional field to be required.
+    """
+    return {"type": "json_schema", "json_schema": {"name": "response", "schema": schema, "strict": False}}
+
 class OpenAIAdapter(BaseAdapter):
-    def __init__(self, model: str = "gpt-4o-mini"):
+    # Fallback pool for adapters built without an injected client (e.g., scripts/tests).
+    _client: Optional[httpx.AsyncClient] = None
+
+    def __init__(self, model: str = "gpt-4o-mini", http_client: Optional[httpx.AsyncClient] = None):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY not set in environment")
-        self.client = AsyncOpenAI(api_key=api_key)
+        # Reuse the app-level pool when given, else the class-wide one; never a fresh pool per adapter
+        self.client = AsyncOpenAI(api_key=api_key, http_client=http_client or self._shared_client())
         super().__init__(model=model)
 
+    @classmethod
+    def _shared_client(cls) -> httpx.AsyncClient:
+        """
+        Lazily built class-wide HTTP/2 pool with keep-alive, shared by every adapter instance.
+        """
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(60.0),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=32),
+            )
+        return cls._client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """
+        Close the fallback client (called from the app shutdown hook).
+        """
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    async def _create(self, **params: Any) -> Any:
+        """
+        chat.completions.create with jittered exponential backoff on rate limits.
+        """
+        for attempt in range(MAX_RETRIES):
+            try:
+                return await self.client.chat.completions.create(**params)
+            except RateLimitError:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                await asyncio.sleep(min(2 ** attempt, 30) + random.random())
+
     async def generate(self, req: LLMRequest, **kwargs: Any) -> LLMResponse:
         """
         Sends a chat-style request to OpenAI and returns a normalized LLMResponse.
         Extra params (temperature, max_tokens, etc.) can be passed via kwargs
         but req.temperature / req.max_tokens take precedence.
+        schema=<JSON Schema dict> constrains the reply to JSON via structured outputs.
         """
         temperature = req.temperature if req.temperature is not None else kwargs.pop("temperature", 0.2)
         max_tokens = req.max_tokens if req.max_tokens is not None else kwargs.pop("max_tokens", None)
+        schema = kwargs.pop("schema", None)
+        if schema is not None:
+            kwargs["response_format"] = _response_format(schema)
 
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._create(
                 model=self.model,
-                messages=[m.model_dump() for m in req.messages],
+                messages=[m.as_dict for m in req.messages],
                 temperature=temperature,
                 max_tokens=max_tokens,
                 **kwargs
@@ -44,13 +109,33 @@ class OpenAIAdapter(BaseAdapter):
                 finish_reason=getattr(choice, "finish_reason", None),
             )
 
-        except RateLimitError as e:
-            raise RuntimeError(f"Rate limit exceeded: {e}") from e
-        except AuthenticationError as e:
-            raise RuntimeError(f"Authentication failed: {e}") from e
-        except APIConnectionError as e:
-            raise RuntimeError(f"Connection error: {e}") from e
-        except APIError as e:
-            raise RuntimeError(f"OpenAI API error: {e}") from e
         except Exception as e:
-            raise RuntimeError(f"Unexpected error: {e}") from e
+            raise _as_runtime_error(e) from e
+
+    async def generate_stream(self, req: LLMRequest, **kwargs: Any) -> AsyncIterator[str]:
+        """
+        Streams text deltas from OpenAI (stream=True) as they arrive.
+        """
+        temperature = req.temperature if req.temperature is not None else kwargs.pop("temperature", 0.2)
+        max_tokens = req.max_tokens if req.max_tokens is not None else kwargs.pop("max_tokens", None)
+        schema = kwargs.pop("schema", None)
+        if schema is not None:
+            kwargs["response_format"] = _response_format(schema)
+
+        try:
+            stream = await self._create(
+                model=self.model,
+                messages=[m.as_dict for m in req.messages],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                **kwargs
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as e:
+            raise _as_runtime_error(e) from e
@@ -0,0 +1,13 @@
+﻿from __future__ import annotations
+from fastapi import Request
+
+from backend.core.knowledge_base import KnowledgeBase
+from backend.core.orchestrator import Orchestrator
+
+# Shared instances are built once in the app lifespan (backend/api/index.py).
+
+def get_orch(request: Request) -> Orchestrator:
+    return request.app.state.orch
+
+def get_kb_dep(request: Request) -> KnowledgeBase:
+    return request.app.state.kb
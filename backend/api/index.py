@@ -1,16 +1,41 @@
 ﻿from backend.config.env import load_env
 load_env()
 
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
+from backend.api.middleware import GzipRequestMiddleware
 from backend.api.routes.ai_routes import router as ai_router
 from backend.api.routes.kb_routes import router as kb_router
 from backend.api.routes.specs_routes import router as specs_router
 from backend.api.routes.mission_routes import router as mission_router
 from backend.api.routes.concept_routes import router as concept_router
 from backend.api.routes.advisor_routes import router as advisor_router
+from backend.core.knowledge_base import get_kb
+from backend.core.orchestrator import Orchestrator
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One HTTP pool, Orchestrator and KB per process, injected into routes via backend.api.deps
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(60.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=30),
+    )
+    app.state.orch = Orchestrator(http_client=app.state.http)
+    app.state.kb = get_kb()
+    # Load the semantic-cache encoder now so the first user request doesn't pay for it
+    app.state.embedder = await asyncio.to_thread(app.state.orch.cache.warm)
+    yield
+    await app.state.orch.aclose()
+    await app.state.http.aclose()
 
-app = FastAPI(title="Aero-AI Backend")
+app = FastAPI(title="Aero-AI Backend", lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(GzipRequestMiddleware)
 
 @app.get("/health")
 async def health():
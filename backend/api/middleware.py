@@ -0,0 +1,74 @@
+﻿from __future__ import annotations
+import zlib
+from typing import List
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Decompressed request bodies larger than this are rejected (guards against gzip bombs).
+MAX_INFLATED_BYTES = 8 * 1024 * 1024
+
+
+class GzipRequestMiddleware:
+    """
+    Accept request bodies sent with `Content-Encoding: gzip` (the Streamlit client
+    compresses large sketch payloads). Starlette's GZipMiddleware only handles responses.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int = MAX_INFLATED_BYTES) -> None:
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or (b"content-encoding", b"gzip") not in scope["headers"]:
+            await self.app(scope, receive, send)
+            return
+
+        chunks: List[bytes] = []
+        more = True
+        while more:
+            message = await receive()
+            if message["type"] != "http.request":  # client disconnected mid-body
+                return
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = inflater.decompress(b"".join(chunks), self.max_size + 1)
+        except zlib.error:
+            await _error_response(send, 400, "Invalid gzip request body")
+            return
+        if len(body) > self.max_size:
+            await _error_response(send, 413, "Decompressed request body too large")
+            return
+        if not inflater.eof:  # truncated stream: zlib returns what it could inflate without raising
+            await _error_response(send, 400, "Invalid gzip request body")
+            return
+
+        headers = [
+            (k, v) for k, v in scope["headers"] if k not in (b"content-encoding", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        scope = dict(scope, headers=headers)
+
+        sent = False
+
+        async def replay() -> Message:
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, replay, send)
+
+
+async def _error_response(send: Send, status: int, detail: str) -> None:
+    """Same {"detail": ...} shape as FastAPI's HTTPException responses."""
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({"type": "http.response.body", "body": orjson.dumps({"detail": detail})})
@@ -1,13 +1,18 @@
 ﻿# backend/api/routes/advisor_routes.py
 from __future__ import annotations
-import json
+import asyncio
 import re
-from typing import Any, Optional
+from typing import Any, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import orjson
 
+from backend.api.deps import get_orch
 from backend.core.orchestrator import Orchestrator
+from backend.core.streaming import SSE_MEDIA_TYPE, sse_events
+from backend.core.types import LLMRequest, Message
 
 
 router = APIRouter(prefix="/advisor", tags=["advisor"])
@@ -32,52 +37,150 @@ class AdvisorResponse(BaseModel):
     answer: AdvisorAnswer
 
 
+_FENCE_OPEN = re.compile(r"^```(?:json)?\s*")
+_FENCE_CLOSE = re.compile(r"\s*```$")
+
+
 def _strip_code_fences(s: str) -> str:
     s = s.strip()
     if s.startswith("```"):
-        s = re.sub(r"^```(?:json)?\s*", "", s)
-        s = re.sub(r"\s*```$", "", s)
+        s = _FENCE_OPEN.sub("", s)
+        s = _FENCE_CLOSE.sub("", s)
     return s.strip()
 
 
-def _safe_json(text: str) -> dict:
-    try:
-        return json.loads(text)
-    except Exception:
-        return {}
+# Only characters that can change nesting depth or string state
+_JSON_SCAN = re.compile(r'[{}"\\]')
 
 
-@router.post("/ask", response_model=AdvisorResponse)
-def ask(req: AdvisorRequest) -> AdvisorResponse:
+def _extract_json_span(text: str) -> Optional[str]:
     """
-    Light-weight mission advisor that turns a user question + spec (+concept) into
-    a helpful, actionable answer. Uses the active LLM via Orchestrator.
+    Return the first balanced {...} span in text, ignoring braces inside string literals.
+    Lets us parse JSON wrapped in prose without exception-driven retries.
     """
-    # Compose a single-prompt instruction (our adapter doesn’t take system role)
-    prompt = f"""
-You are an aerospace mission advisor. Be pragmatic and safety-aware. If the user's request is not feasible, clearly say so and propose realistic alternatives and concrete next steps.
+    start = text.find("{")
+    if start == -1:
+        return None
+    depth = 0
+    in_str = False
+    skip_to = -1  # index of a char escaped by a preceding backslash
+    for m in _JSON_SCAN.finditer(text, start):
+        i = m.start()
+        if i == skip_to:
+            continue
+        ch = m.group()
+        if in_str:
+            if ch == "\\":
+                skip_to = i + 1
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
 
-Context:
-- Target objective: {req.target}
-- Rocket spec (JSON): {json.dumps(req.spec)}
-- Current concept (JSON, may be empty): {json.dumps(req.concept or {})}
-- Answer style: {req.style}
 
-User question:
-{req.question}
+def _safe_json(text: str) -> dict:
+    span = _extract_json_span(text)
+    if span is None:
+        return {}
+    try:
+        data = orjson.loads(span)
+    except orjson.JSONDecodeError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+# Stable instructions + schema go first so providers can reuse the cached prompt prefix;
+# only the short per-question suffix changes between calls on the same spec.
+_ADVISOR_INSTRUCTIONS = """
+You are an aerospace mission advisor. Be pragmatic and safety-aware. If the user's request is not feasible, clearly say so and propose realistic alternatives and concrete next steps.
 
 Return ONLY JSON with this schema (no prose outside JSON):
-{{
+{
   "answer_md": "<markdown explanation with bullets and short sections>",
-  "actions": [{{"type":"<short action name>", "why":"<1 sentence reason>"}}],
+  "actions": [{"type":"<short action name>", "why":"<1 sentence reason>"}],
   "clarifying_questions": ["<short question>", "..."]
-}}
+}
 """
 
+
+# Bodies above this size get their spec/concept dumps offloaded to worker threads.
+_OFFLOAD_JSON_BYTES = 10_000
+
+
+def _dumps(obj: Any) -> str:
+    # Stable output feeds both the prompt prefix and the LLM cache key
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
+
+
+# Concept fields the advisor never needs: the narrative report restates the structured
+# fields, spec_draft duplicates req.spec, and citations/sketch metadata are display-only.
+_CONCEPT_SKIP_KEYS = frozenset({"report_md", "spec_draft", "citations", "sketch_meta"})
+
+
+def _digest_concept(concept: Optional[dict]) -> dict:
+    return {k: v for k, v in (concept or {}).items() if k not in _CONCEPT_SKIP_KEYS}
+
+
+async def _dump_context(req: AdvisorRequest, body_bytes: int) -> Tuple[str, str]:
+    concept = _digest_concept(req.concept)
+    if body_bytes > _OFFLOAD_JSON_BYTES:
+        spec_json, concept_json = await asyncio.gather(
+            asyncio.to_thread(_dumps, req.spec),
+            asyncio.to_thread(_dumps, concept),
+        )
+        return spec_json, concept_json
+    return _dumps(req.spec), _dumps(concept)
+
+
+def _build_messages(req: AdvisorRequest, spec_json: str, concept_json: str) -> List[Message]:
+    static_prefix = (
+        f"{_ADVISOR_INSTRUCTIONS}\n"
+        "Context:\n"
+        f"- Rocket spec (JSON): {spec_json}\n"
+        f"- Current concept (JSON, may be empty): {concept_json}\n"
+    )
+    dynamic_suffix = (
+        f"- Target objective: {req.target}\n"
+        f"- Answer style: {req.style}\n\n"
+        f"User question:\n{req.question}\n"
+    )
+    return [
+        Message(role="system", content=static_prefix),
+        Message(role="user", content=dynamic_suffix),
+    ]
+
+
+@router.post("/ask", response_model=AdvisorResponse)
+async def ask(
+    req: AdvisorRequest,
+    request: Request,
+    stream: bool = Query(default=False, description="Stream the raw model output as Server-Sent Events"),
+    orch: Orchestrator = Depends(get_orch),
+) -> AdvisorResponse:
+    """
+    Light-weight mission advisor that turns a user question + spec (+concept) into
+    a helpful, actionable answer. Uses the active LLM via Orchestrator.
+    With stream=true, the raw JSON answer is streamed as SSE and parsed client-side.
+    """
+    # Content-Length bounds the spec/concept size without serializing them first
+    body_bytes = int(request.headers.get("content-length") or 0)
+    spec_json, concept_json = await _dump_context(req, body_bytes)
+    llm_req = LLMRequest(messages=_build_messages(req, spec_json, concept_json), temperature=0.3)
+
+    if stream:
+        chunks = orch.generate_stream(req=llm_req, model=req.model)
+        return StreamingResponse(sse_events(chunks), media_type=SSE_MEDIA_TYPE)
+
     try:
-        orch = Orchestrator()
-        llm = orch.generate(prompt=prompt, temperature=0.3, model=req.model)
-        raw = (llm.get("text") or "").strip()
+        llm = await orch.generate(req=llm_req, model=req.model)
+        raw = (llm.text or "").strip()
         parsed = _safe_json(_strip_code_fences(raw))
         if not parsed or "answer_md" not in parsed:
             # Fallback: wrap raw text into expected shape
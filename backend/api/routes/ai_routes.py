@@ -1,14 +1,17 @@
 ﻿from __future__ import annotations
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query
+import msgspec
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from backend.api.deps import get_orch
 from backend.core.orchestrator import Orchestrator
+from backend.core.streaming import SSE_MEDIA_TYPE, sse_events
 from backend.core.types import LLMRequest, Message
 
 router = APIRouter(prefix="/ai", tags=["ai"])
-orch = Orchestrator()
 
 
 class ChatBody(BaseModel):
@@ -22,9 +25,12 @@ async def chat(
     body: ChatBody,
     provider: Optional[str] = Query(default=None, description="Override provider, e.g. 'openai'"),
     model: Optional[str] = Query(default=None, description="Override model, e.g. 'gpt-4o-mini'"),
+    stream: bool = Query(default=False, description="Stream text deltas as Server-Sent Events"),
+    orch: Orchestrator = Depends(get_orch),
 ):
     """
     Send a single-prompt chat to the orchestrator and return a normalized response.
+    With stream=true, text deltas are sent as SSE as soon as the provider emits them.
     """
     try:
         req = LLMRequest(
@@ -32,12 +38,15 @@ async def chat(
             temperature=body.temperature if body.temperature is not None else 0.2,
             max_tokens=body.max_tokens,
         )
+        if stream:
+            chunks = orch.generate_stream(req=req, provider=provider, model=model)
+            return StreamingResponse(sse_events(chunks), media_type=SSE_MEDIA_TYPE)
         resp = await orch.generate(req=req, provider=provider, model=model)
-        return resp.model_dump()
+        return msgspec.structs.asdict(resp)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/providers")
-async def providers():
-    return {"orchestrator": orch.info()}
+async def providers(orch: Orchestrator = Depends(get_orch)):
+    return {"orchestrator": orch.info(), "health": await orch.health()}
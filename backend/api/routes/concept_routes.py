@@ -1,12 +1,19 @@
 ﻿from __future__ import annotations
+import asyncio
 import inspect
-from typing import Optional, List, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
-from backend.core.parametric_specs import RocketSpecDraft, MissionPlan  # types only
-from backend.core.concept_llm import ai_compose_concept
+from backend.api.deps import get_orch
+from backend.core.orchestrator import Orchestrator
+from backend.core.parametric_specs import (
+    EstimateOverrides, MissionPlan, RocketSpecDraft, SketchMeta, estimate_specs,
+)
+from backend.core.concept_llm import ai_compose_concept, ai_compose_concept_stream
+from backend.core.streaming import SSE_MEDIA_TYPE, sse_events
 
 router = APIRouter(prefix="/concept", tags=["concept"])
 
@@ -18,6 +25,16 @@ class ComposeFromSpecBody(BaseModel):
     kb_hits: Optional[List[dict]] = None  # optional grounding snippets from the KB/UI
 
 
+class EstimateAndComposeBody(BaseModel):
+    """/specs/estimate and /concept/compose_from_spec inputs in one request."""
+    scale_m_per_px: float = Field(..., gt=0, description="Meters per pixel (user provided)")
+    sketch: SketchMeta
+    overrides: Optional[EstimateOverrides] = None
+    target: str = "LEO"  # "LEO" or "TLI"
+    origin_hint: Optional[str] = None
+    kb_hits: Optional[List[dict]] = None
+
+
 def _to_mission_plan(obj: Any) -> MissionPlan:
     """Coerce various return shapes into a MissionPlan."""
     if isinstance(obj, MissionPlan):
@@ -31,40 +48,115 @@ def _to_mission_plan(obj: Any) -> MissionPlan:
     raise TypeError(f"Unsupported mission plan return type: {type(obj)}")
 
 
+def _resolve_plan_fns() -> Tuple[Callable[..., Any], ...]:
+    """
+    Find mission planning function(s) in backend.core.parametric_specs once, at import.
+    Well-known names win; otherwise any function with "plan" in its name is a candidate.
+    """
+    from backend.core import parametric_specs as ps  # import module to inspect
+
+    # 1) Try common names first
+    for fname in ("plan_mission", "compute_mission_plan", "generate_mission_plan", "make_mission_plan", "mission_plan"):
+        fn = getattr(ps, fname, None)
+        if callable(fn):
+            return (fn,)
+
+    # 2) Fallback: any function with "plan" in its name
+    return tuple(fn for name, fn in inspect.getmembers(ps, inspect.isfunction) if "plan" in name.lower())
+
+
+_PLAN_FNS = _resolve_plan_fns()
+
+
 def _compute_mission_plan(spec: RocketSpecDraft, target: str) -> MissionPlan:
     """
-    Find and call a mission planning function from backend.core.parametric_specs
+    Call the mission planning function resolved at import time
     WITHOUT making HTTP calls to our own server (avoids deadlocks).
     """
     try:
-        from backend.core import parametric_specs as ps  # import module to inspect
-
-        # 1) Try common names first
-        for fname in ("plan_mission", "compute_mission_plan", "generate_mission_plan", "make_mission_plan"):
-            fn = getattr(ps, fname, None)
-            if callable(fn):
+        if not _PLAN_FNS:
+            raise RuntimeError(
+                "No mission planning function found in backend.core.parametric_specs. "
+                "Expected something like plan_mission(spec, target)."
+            )
+        if len(_PLAN_FNS) == 1:
+            return _to_mission_plan(_PLAN_FNS[0](spec, target))
+
+        last_err: Optional[Exception] = None
+        for fn in _PLAN_FNS:
+            try:
                 return _to_mission_plan(fn(spec, target))
-
-        # 2) Fallback: scan for any function with "plan" in its name that takes 2+ args
-        for name, fn in inspect.getmembers(ps, inspect.isfunction):
-            if "plan" in name.lower():
-                try:
-                    return _to_mission_plan(fn(spec, target))
-                except Exception:
-                    continue
-
-        raise RuntimeError(
-            "No mission planning function found in backend.core.parametric_specs. "
-            "Expected something like plan_mission(spec, target)."
-        )
+            except Exception as e:
+                last_err = e
+        raise RuntimeError(f"All candidate mission planners failed: {last_err}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Mission plan computation failed: {e}")
 
 
+def _concept_body(
+    ai: Dict[str, Any], spec_dict: Dict[str, Any], plan_dict: Dict[str, Any], origin_hint: Optional[str]
+) -> Dict[str, Any]:
+    """Response concept: the request context plus the model's sites, BoM and report."""
+    return {
+        "spec_draft": spec_dict,
+        "mission_plan": plan_dict,
+        "origin_inferred": {"hint": origin_hint},
+        "launch_sites": ai.get("launch_sites", []),
+        "lunar_sites": ai.get("lunar_sites", []),
+        "bom": ai.get("bom", {"currency": "USD", "items": [], "total_est_cost": 0}),
+        "note": ai.get("note"),
+        "citations": ai.get("citations", []),
+        "report_md": ai.get("report_md"),
+    }
+
+
+async def _compose(
+    spec: RocketSpecDraft,
+    target: str,
+    origin_hint: Optional[str],
+    kb_hits: Optional[List[dict]],
+    stream: bool,
+    orch: Orchestrator,
+    with_spec: bool = False,
+):
+    """
+    Shared body of compose_from_spec / estimate_and_compose. With with_spec, the
+    spec draft is returned alongside the concept (as a leading `spec` SSE event when streaming).
+    Streams end with a `concept` event carrying the same concept the buffered path returns.
+    """
+    # The plan is computed on a worker thread (keeps the event loop free); the spec only
+    # depends on the request, so it is dumped while the plan is in flight.
+    plan_task = asyncio.ensure_future(asyncio.to_thread(_compute_mission_plan, spec, target))
+    # Dump once; reused for the prompt JSON and the response body
+    spec_dict = spec.model_dump(mode="json")
+    plan: MissionPlan = await plan_task
+    plan_dict = plan.model_dump(mode="json")
+    if stream:
+        done: Dict[str, Any] = {}
+        chunks = ai_compose_concept_stream(
+            spec, plan, origin_hint, kb_hits,
+            orch=orch, spec_dict=spec_dict, plan_dict=plan_dict,
+            on_concept=lambda ai: done.update(concept=_concept_body(ai, spec_dict, plan_dict, origin_hint)),
+        )
+        head = (("spec", spec_dict),) if with_spec else ()
+        tail = lambda: (("concept", done["concept"]),)
+        return StreamingResponse(sse_events(chunks, head=head, tail=tail), media_type=SSE_MEDIA_TYPE)
+
+    ai = await ai_compose_concept(
+        spec, plan, origin_hint, kb_hits,
+        orch=orch, spec_dict=spec_dict, plan_dict=plan_dict,
+    )
+
+    concept = _concept_body(ai, spec_dict, plan_dict, origin_hint)
+    return {"spec": spec_dict, "concept": concept} if with_spec else concept
+
+
 @router.post("/compose_from_spec")
 async def compose_from_spec(
     body: ComposeFromSpecBody,
     mode: str = Query("pure_ai", pattern="^(pure_ai)$"),
+    stream: bool = Query(default=False, description="Stream the raw concept JSON as Server-Sent Events"),
+    orch: Orchestrator = Depends(get_orch),
 ):
     """
     Pure AI composition (OpenAI via Orchestrator) for:
@@ -74,21 +166,35 @@ async def compose_from_spec(
 
     We compute a MissionPlan in-process for solid constraints (no HTTP self-calls).
     All sites/lunar/BoM content is produced by the LLM.
+    With stream=true, the model's JSON is streamed as SSE deltas (for live display),
+    followed by an `event: concept` carrying the finalized concept.
+    """
+    try:
+        return await _compose(body.spec, body.target, body.origin_hint, body.kb_hits, stream, orch)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/estimate_and_compose")
+async def estimate_and_compose(
+    body: EstimateAndComposeBody,
+    mode: str = Query("pure_ai", pattern="^(pure_ai)$"),
+    stream: bool = Query(default=False, description="Stream the raw concept JSON as Server-Sent Events"),
+    orch: Orchestrator = Depends(get_orch),
+):
+    """
+    /specs/estimate followed by /concept/compose_from_spec, in one round-trip.
+    Returns {"spec", "concept"}; with stream=true the spec arrives first as an
+    `event: spec` SSE event, followed by the concept JSON deltas and a final `event: concept`.
     """
     try:
-        plan: MissionPlan = _compute_mission_plan(body.spec, body.target)
-        ai = await ai_compose_concept(body.spec, plan, body.origin_hint, body.kb_hits)
-
-        return {
-            "spec_draft": body.spec.model_dump(),
-            "mission_plan": plan.model_dump(),
-            "origin_inferred": {"hint": body.origin_hint},
-            "launch_sites": ai.get("launch_sites", []),
-            "lunar_sites": ai.get("lunar_sites", []),
-            "bom": ai.get("bom", {"currency": "USD", "items": [], "total_est_cost": 0}),
-            "note": ai.get("note"),
-            "citations": ai.get("citations", []),
-        }
+        spec = estimate_specs(body.sketch, body.scale_m_per_px, body.overrides)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Spec estimate failed: {e}")
+    try:
+        return await _compose(spec, body.target, body.origin_hint, body.kb_hits, stream, orch, with_spec=True)
     except HTTPException:
         raise
     except Exception as e:
@@ -1,23 +1,32 @@
 ﻿from __future__ import annotations
-from typing import Optional, List
-from fastapi import APIRouter, HTTPException, Query
-from backend.core.knowledge_base import get_kb, RocketSpec
+from typing import Any, Optional
+import msgspec
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from backend.api.deps import get_kb_dep
+from backend.core.knowledge_base import KnowledgeBase
 
 router = APIRouter(prefix="/kb", tags=["knowledge-base"])
-kb = get_kb()
 
-@router.get("/rockets", response_model=List[RocketSpec])
-async def list_rockets(limit: Optional[int] = Query(default=None)):
+def _json(obj: Any) -> Response:
+    # KB records are msgspec Structs; encode them directly instead of via a pydantic response_model
+    return Response(content=msgspec.json.encode(obj), media_type="application/json")
+
+@router.get("/rockets")
+async def list_rockets(limit: Optional[int] = Query(default=None), kb: KnowledgeBase = Depends(get_kb_dep)):
     items = kb.all()
-    return items[:limit] if limit else items
+    return _json(items[:limit] if limit else items)
 
-@router.get("/rockets/{rocket_id}", response_model=RocketSpec)
-async def get_rocket(rocket_id: str):
+@router.get("/rockets/{rocket_id}")
+async def get_rocket(rocket_id: str, kb: KnowledgeBase = Depends(get_kb_dep)):
     item = kb.get(rocket_id)
     if not item:
         raise HTTPException(status_code=404, detail=f"Rocket '{rocket_id}' not found")
-    return item
+    return _json(item)
 
-@router.get("/search", response_model=List[RocketSpec])
-async def search_rockets(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
-    return kb.search(q, limit=limit)
+@router.get("/search")
+async def search_rockets(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    kb: KnowledgeBase = Depends(get_kb_dep),
+):
+    return _json(kb.search(q, limit=limit))
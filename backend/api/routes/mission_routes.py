@@ -1,4 +1,6 @@
 ﻿from __future__ import annotations
+import asyncio
+
 from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
 
@@ -14,7 +16,8 @@ class TrajectoryBody(BaseModel):
 @router.post("/trajectory.png")
 async def trajectory_png(body: TrajectoryBody):
     try:
-        png = make_trajectory_png(body.plan, body.spec)
+        # Rendered off the event loop so a concurrent blueprint/trajectory pair overlaps
+        png = await asyncio.to_thread(make_trajectory_png, body.plan, body.spec)
         return Response(content=png, media_type="image/png")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
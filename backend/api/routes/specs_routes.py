@@ -1,4 +1,6 @@
 ﻿from __future__ import annotations
+import asyncio
+
 from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 
@@ -39,7 +41,7 @@ class BlueprintBody(BaseModel):
 @router.post("/blueprint.svg")
 async def blueprint_svg(body: BlueprintBody, theme: str = Query("blueprint", regex="^(blueprint|light)$")):
     try:
-        svg = make_blueprint_svg(body.spec, theme=theme)
+        svg = await asyncio.to_thread(make_blueprint_svg, body.spec, theme=theme)
         return Response(content=svg, media_type="image/svg+xml")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
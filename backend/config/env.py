@@ -2,10 +2,17 @@
 from pathlib import Path
 from dotenv import load_dotenv as dotenv_load
 
+_ENV_LOADED = False
+
 def load_env() -> None:
     """
     Load environment variables from the project root .env file.
+    Only the first call touches the disk; later calls are no-ops.
     """
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    _ENV_LOADED = True
     root = Path(__file__).resolve().parents[2]
     env_path = root / ".env"
     if env_path.exists():
@@ -1,10 +1,12 @@
 ﻿from __future__ import annotations
+from functools import lru_cache
 from typing import Tuple
 from backend.core.parametric_specs import RocketSpecDraft, StageEstimate
 
 PAD = 20       # px padding around rocket
 PX_PER_M = 5   # meters → pixels
 TEXT_SIZE = 12
+GRID_STEP = 20  # px between grid lines
 
 def _fmt(val: float, n: int = 2) -> str:
     return f"{val:.{n}f}"
@@ -20,13 +22,44 @@ def _palette(theme: str) -> Tuple[str, str, str, str, str]:
     # default: blueprint
     return ("#0a1a2f", "#7fd0ff", "#bfe9ff", "#2a4a6a", "#7fd0ff")
 
+@lru_cache(maxsize=4)
+def _theme_assets(theme: str) -> Tuple[Tuple[str, str, str, str, str], str]:
+    """
+    Returns (palette, css) for a theme; both are identical across requests so build them once.
+    """
+    colors = _palette(theme)
+    _, stroke, text, axis, _ = colors
+    css = f"""
+    .t {{ font: {TEXT_SIZE}px ui-monospace, SFMono-Regular, Menlo, Consolas, monospace; fill:{text} }}
+    .b {{ fill:none; stroke:{stroke}; stroke-width:2 }}
+    .axis {{ stroke:{axis}; stroke-width:1; stroke-dasharray:4 4 }}
+    .grid {{ stroke:{axis}; stroke-width:0.5; stroke-opacity:0.5 }}
+    """
+    return colors, css
+
+@lru_cache(maxsize=64)
+def _grid_lines(canvas_w: int, canvas_h: int, grid_step: int) -> str:
+    """
+    Grid markup for a given canvas size; colors come from the .grid CSS class,
+    so the string is theme-independent and repeats across similar specs.
+    """
+    y1, y2 = PAD, canvas_h - PAD
+    x1, x2 = PAD, canvas_w - PAD
+    vertical = "\n".join(
+        f'<line class="grid" x1="{x}" y1="{y1}" x2="{x}" y2="{y2}" />' for x in range(PAD, x2, grid_step)
+    )
+    horizontal = "\n".join(
+        f'<line class="grid" x1="{x1}" y1="{y}" x2="{x2}" y2="{y}" />' for y in range(PAD, y2, grid_step)
+    )
+    return f"{vertical}\n{horizontal}"
+
 def make_blueprint_svg(spec: RocketSpecDraft, theme: str = "blueprint") -> str:
     H = spec.total_height_m or 1.0
     D = spec.max_diameter_m or 1.0
     canvas_h = int(H * PX_PER_M + PAD * 2 + 40)
     canvas_w = int(max(D, 1.0) * PX_PER_M + PAD * 2 + 180)
 
-    bg, stroke, text, axis, accent = _palette(theme)
+    (bg, stroke, text, axis, accent), css = _theme_assets(theme)
     cx = PAD + (D * PX_PER_M) / 2
 
     # Stage boxes (top→bottom)
@@ -40,14 +73,6 @@ def make_blueprint_svg(spec: RocketSpecDraft, theme: str = "blueprint") -> str:
         stage_boxes.append((x, y, w_px, h_px, s))
         y_cursor += h_px
 
-    # CSS (colors per theme)
-    css = f"""
-    .t {{ font: {TEXT_SIZE}px ui-monospace, SFMono-Regular, Menlo, Consolas, monospace; fill:{text} }}
-    .b {{ fill:none; stroke:{stroke}; stroke-width:2 }}
-    .axis {{ stroke:{axis}; stroke-width:1; stroke-dasharray:4 4 }}
-    .grid {{ stroke:{axis}; stroke-width:0.5; stroke-opacity:0.5 }}
-    """
-
     svg = [
         f'<svg xmlns="http://www.w3.org/2000/svg" width="{canvas_w}" height="{canvas_h}" viewBox="0 0 {canvas_w} {canvas_h}">',
         f'<rect x="0" y="0" width="{canvas_w}" height="{canvas_h}" fill="{bg}"/>',
@@ -55,11 +80,7 @@ def make_blueprint_svg(spec: RocketSpecDraft, theme: str = "blueprint") -> str:
     ]
 
     # Grid
-    grid_step = 20
-    for x in range(PAD, canvas_w - PAD, grid_step):
-        svg.append(f'<line class="grid" x1="{x}" y1="{PAD}" x2="{x}" y2="{canvas_h-PAD}" />')
-    for y in range(PAD, canvas_h - PAD, grid_step):
-        svg.append(f'<line class="grid" x1="{PAD}" y1="{y}" x2="{canvas_w-PAD}" y2="{y}" />')
+    svg.append(_grid_lines(canvas_w, canvas_h, GRID_STEP))
 
     # Centerline axis
     svg.append(f'<line class="axis" x1="{cx}" y1="{PAD}" x2="{cx}" y2="{canvas_h-PAD}" />')
@@ -0,0 +1,61 @@
+﻿from __future__ import annotations
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from backend.core.llm_cache import CACHE_TTL_S
+
+MAX_ENTRIES = int(os.getenv("AERO_COMPOSE_CACHE_MAX_ENTRIES", "512"))
+
+
+class ComposeCache:
+    """
+    LRU of finalized concepts keyed by a BLAKE2b hash of the structural compose inputs
+    (spec, plan, origin hint, KB hits). A hit skips the prompt build, the LLM round-trip
+    and the JSON parse. Concepts are stored as orjson bytes so callers get a fresh copy.
+    """
+
+    def __init__(self, ttl_s: int = CACHE_TTL_S, max_entries: int = MAX_ENTRIES):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    @staticmethod
+    def key(
+        spec_dict: Dict[str, Any],
+        plan_dict: Dict[str, Any],
+        origin_hint: Optional[str],
+        kb_hits: Optional[List[dict]],
+    ) -> str:
+        blob = orjson.dumps([spec_dict, plan_dict, origin_hint, kb_hits or []], option=orjson.OPT_SORT_KEYS)
+        return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        hit = self._data.get(key)
+        if hit is None:
+            return None
+        ts, blob = hit
+        if time.time() - ts > self.ttl_s:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return orjson.loads(blob)
+
+    def put(self, key: str, concept: Dict[str, Any]) -> None:
+        self._data[key] = (time.time(), orjson.dumps(concept))
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_cache = ComposeCache()
+
+def get_compose_cache() -> ComposeCache:
+    return _cache
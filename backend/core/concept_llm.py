@@ -1,11 +1,15 @@
 ﻿from __future__ import annotations
 import json
 import re
-import inspect
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
-from backend.core.orchestrator import Orchestrator
+import orjson
+
+from backend.core.compose_cache import get_compose_cache
+from backend.core.orchestrator import Orchestrator, get_orchestrator
 from backend.core.parametric_specs import RocketSpecDraft, MissionPlan
+from backend.core.types import LLMRequest, LLMResponse, Message
 
 # High-level guidance is inlined into the prompt so no special kwargs are needed.
 _SYS = (
@@ -18,183 +22,307 @@ _SYS = (
 
 # Core schema + optional AI-authored narrative fields.
 # (Front-end reads core keys; extra keys are additive and safe to ignore.)
-_JSON_SCHEMA_STR = """
-{
-  "type": "object",
-  "properties": {
-    "note": { "type": "string" },
-
-    "launch_sites": {
-      "type": "array",
-      "items": {
-        "type": "object",
-        "properties": {
-          "name": { "type": "string" },
-          "state": { "type": "string" },
-          "country": { "type": "string" },
-          "type": { "type": "string", "enum": ["vertical","horizontal","unknown"] },
-          "faa_licensed": { "type": "boolean" },
-          "suitability_score": { "type": "number" },
-          "why": { "type": "string" },
-          "confidence": { "type": "string" }
+_SCHEMA_DICT: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "note": {"type": "string"},
+
+        "launch_sites": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "state": {"type": "string"},
+                    "country": {"type": "string"},
+                    "type": {"type": "string", "enum": ["vertical", "horizontal", "unknown"]},
+                    "faa_licensed": {"type": "boolean"},
+                    "suitability_score": {"type": "number"},
+                    "why": {"type": "string"},
+                    "confidence": {"type": "string"},
+                },
+                "required": ["name", "country", "why", "suitability_score"],
+            },
         },
-        "required": ["name","country","why","suitability_score"]
-      }
-    },
 
-    "lunar_sites": {
-      "type": "array",
-      "items": {
-        "type": "object",
-        "properties": {
-          "name": { "type": "string" },
-          "traits": { "type": "array", "items": { "type": "string" } },
-          "why": { "type": "string" },
-          "confidence": { "type": "string" }
+        "lunar_sites": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "traits": {"type": "array", "items": {"type": "string"}},
+                    "why": {"type": "string"},
+                    "confidence": {"type": "string"},
+                },
+                "required": ["name"],
+            },
         },
-        "required": ["name"]
-      }
-    },
 
-    "bom": {
-      "type": "object",
-      "properties": {
-        "currency": { "type": "string" },
-        "uncertainty": { "type": "string" },
-        "items": {
-          "type": "array",
-          "items": {
+        "bom": {
             "type": "object",
             "properties": {
-              "item": { "type": "string" },
-              "qty": {},
-              "uom": { "type": "string" },
-              "est_cost": { "type": "number" }
+                "currency": {"type": "string"},
+                "uncertainty": {"type": "string"},
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "item": {"type": "string"},
+                            "qty": {},
+                            "uom": {"type": "string"},
+                            "est_cost": {"type": "number"},
+                        },
+                        "required": ["item", "est_cost"],
+                    },
+                },
+                "total_est_cost": {"type": "number"},
             },
-            "required": ["item","est_cost"]
-          }
+            "required": ["currency", "items", "total_est_cost"],
         },
-        "total_est_cost": { "type": "number" }
-      },
-      "required": ["currency","items","total_est_cost"]
-    },
 
-    "citations": {
-      "type": "array",
-      "items": {
-        "type": "object",
-        "properties": {
-          "title": { "type": "string" },
-          "source": { "type": "string" },
-          "why_relevant": { "type": "string" }
-        }
-      }
-    },
+        "citations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "source": {"type": "string"},
+                    "why_relevant": {"type": "string"},
+                },
+            },
+        },
 
-    /* --- Optional AI-authored narrative fields to make it feel "AI-composed" --- */
-    "report_md": { "type": "string" },
-    "assumptions": { "type": "array", "items": { "type": "string" } },
-    "risks": { "type": "array", "items": {
-      "type": "object",
-      "properties": { "risk": { "type": "string" }, "mitigation": { "type": "string" }, "confidence": { "type": "string" } }
-    } },
-    "alternatives": { "type": "array", "items": { "type": "string" } },
-    "next_steps": { "type": "array", "items": { "type": "string" } },
-    "key_numbers": { "type": "array", "items": {
-      "type": "object",
-      "properties": { "label": { "type": "string" }, "value": {}, "unit": { "type": "string" }, "confidence": { "type": "string" } }
-    } },
-    "regulatory_flags": { "type": "array", "items": { "type": "string" } },
-    "ops_checklist": { "type": "array", "items": { "type": "string" } }
-  },
-  "required": ["launch_sites","lunar_sites","bom"]
+        # --- Optional AI-authored narrative fields to make it feel "AI-composed" ---
+        "report_md": {"type": "string"},
+        "assumptions": {"type": "array", "items": {"type": "string"}},
+        "risks": {"type": "array", "items": {
+            "type": "object",
+            "properties": {"risk": {"type": "string"}, "mitigation": {"type": "string"}, "confidence": {"type": "string"}},
+        }},
+        "alternatives": {"type": "array", "items": {"type": "string"}},
+        "next_steps": {"type": "array", "items": {"type": "string"}},
+        "key_numbers": {"type": "array", "items": {
+            "type": "object",
+            "properties": {"label": {"type": "string"}, "value": {}, "unit": {"type": "string"}, "confidence": {"type": "string"}},
+        }},
+        "regulatory_flags": {"type": "array", "items": {"type": "string"}},
+        "ops_checklist": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["launch_sites", "lunar_sites", "bom"],
+    "additionalProperties": False,
 }
-"""
+
+# Minified once at import: valid JSON (no comments) and fewer prompt tokens.
+_JSON_SCHEMA_STR = json.dumps(_SCHEMA_DICT, separators=(",", ":"))
+
+# Style guide nudges the model to produce a realistic, human-readable report in 'report_md'
+_INSTRUCTIONS = (
+    "- Propose feasible launch sites (rank with 'suitability_score' 0..1) and explain briefly in 'why'. "
+    "If origin lacks orbital vertical pads, say so in 'note' and propose nearest viable sites.\n"
+    "- Propose 2–3 lunar sites with 'traits' and 'why'.\n"
+    "- Propose a concept-level BoM: a few line items and a total with 'uncertainty'.\n"
+    "- Also produce a short 'report_md' (Markdown) that summarizes the concept in friendly, beginner language. "
+    "Use sections: Overview, Launch Site Choice, Lunar Site Rationale, Vehicle & Performance, BoM & Cost, Risks & Mitigations, Next Steps.\n"
+    "- If you draw from common knowledge, you MAY include a 'citations' array (title/source only, no URLs).\n"
+    "- Return ONLY JSON, no extra text."
+)
+
+# Immutable preamble sent as the system message, so provider prompt caches see an identical prefix.
+# Keep the full schema here: OpenAI only caches prefixes of 1024+ tokens.
+_STATIC_SYSTEM_PROMPT = (
+    "SYSTEM:\n" + _SYS + "\n\n"
+    "SCHEMA:\n" + _JSON_SCHEMA_STR + "\n\n"
+    "INSTRUCTIONS:\n" + _INSTRUCTIONS
+)
+
+_FENCE_PREFIX = re.compile(r"^```(?:json)?\s*", re.IGNORECASE)
+_FENCE_SUFFIX = re.compile(r"\s*```$")
 
 def _strip_code_fences(s: str) -> str:
     s = s.strip()
-    if s.startswith("```"):
-        s = re.sub(r"^```(?:json)?\\s*", "", s)
-        s = re.sub(r"\\s*```$", "", s)
+    if not s.startswith("```"):
+        return s
+    # Common case: ```json ... ``` with nothing odd around it.
+    if s.startswith("```json\n") and s.endswith("```"):
+        return s.removeprefix("```json").strip().removesuffix("```").strip()
+    s = _FENCE_PREFIX.sub("", s)
+    s = _FENCE_SUFFIX.sub("", s)
     return s.strip()
 
+_DECODER = json.JSONDecoder()
+
 def _safe_json_load(s: str) -> Optional[dict]:
+    """
+    Fast path: orjson on the whole text. Repair path: raw_decode the first complete
+    JSON value starting at the first '{', ignoring any trailing prose.
+    """
+    try:
+        return orjson.loads(s)
+    except orjson.JSONDecodeError:
+        pass
+    start = s.find("{")
+    if start == -1:
+        return None
     try:
-        return json.loads(s)
-    except Exception:
+        data, _ = _DECODER.raw_decode(s, start)
+        return data
+    except ValueError:
         return None
 
 def _kb_compact(kb_hits: Optional[List[dict]]) -> str:
     if not kb_hits:
         return "none"
-    lines = []
-    for r in kb_hits:
-        engines = "; ".join([f"St{e.get('stage')}: {e.get('count')}×{e.get('type')}" for e in r.get("engines", [])])
+    # Keyed on content, not object ids: request dicts are short-lived and ids get reused.
+    return _kb_compact_cached(orjson.dumps(kb_hits, option=orjson.OPT_SORT_KEYS))
+
+# One pipe-delimited row per rocket; engines as stage x count x type.
+_KB_HEADER = "name|stages|H_m|D_m|LEO_kg|engines(stage x count x type)"
+
+@lru_cache(maxsize=128)
+def _kb_compact_cached(kb_json: bytes) -> str:
+    lines = [_KB_HEADER]
+    for r in orjson.loads(kb_json):
+        engines = ",".join([f"{e.get('stage')}x{e.get('count')}x{e.get('type')}" for e in r.get("engines", [])])
         lines.append(
-            f"- {r.get('name')} (stages={r.get('stages')}, H={r.get('height_m')}m, D={r.get('diameter_m')}m, "
-            f"LEO={r.get('payload_leo_kg')}kg) engines: {engines}"
+            f"{r.get('name')}|{r.get('stages')}|{r.get('height_m')}|{r.get('diameter_m')}|{r.get('payload_leo_kg')}|{engines}"
         )
-    return "\\n".join(lines)
+    return "\n".join(lines)
 
-def _build_prompt(
-    spec: RocketSpecDraft,
+def _dynamic_user_prompt(
+    spec_json: str,
     plan: MissionPlan,
+    plan_json: str,
     origin_hint: Optional[str],
     kb_hits: Optional[List[dict]]
 ) -> str:
     kb_block = _kb_compact(kb_hits)
-    # Style guide nudges the model to produce a realistic, human-readable report in 'report_md'
     return (
-        "SYSTEM:\\n" + _SYS + "\\n\\n"
-        "SCHEMA:\\n" + _JSON_SCHEMA_STR + "\\n\\n"
-        "CONTEXT:\\n"
-        f"- Origin hint (may be vague): {origin_hint or 'none'}\\n"
-        f"- Mission target: {getattr(plan.target, 'value', str(plan.target))}\\n"
-        f"- SPEC_JSON: {spec.model_dump_json()}\\n"
-        f"- PLAN_JSON: {plan.model_dump_json()}\\n"
-        f"- KB_SNIPPETS (optional):\\n{kb_block}\\n\\n"
-        "INSTRUCTIONS:\\n"
-        "- Propose feasible launch sites (rank with 'suitability_score' 0..1) and explain briefly in 'why'. "
-        "If origin lacks orbital vertical pads, say so in 'note' and propose nearest viable sites.\\n"
-        "- Propose 2–3 lunar sites with 'traits' and 'why'.\\n"
-        "- Propose a concept-level BoM: a few line items and a total with 'uncertainty'.\\n"
-        "- Also produce a short 'report_md' (Markdown) that summarizes the concept in friendly, beginner language. "
-        "Use sections: Overview, Launch Site Choice, Lunar Site Rationale, Vehicle & Performance, BoM & Cost, Risks & Mitigations, Next Steps.\\n"
-        "- If you draw from common knowledge, you MAY include a 'citations' array (title/source only, no URLs).\\n"
-        "- Return ONLY JSON, no extra text."
+        "CONTEXT:\n"
+        f"- Origin hint (may be vague): {origin_hint or 'none'}\n"
+        f"- Mission target: {getattr(plan.target, 'value', str(plan.target))}\n"
+        f"- SPEC_JSON: {spec_json}\n"
+        f"- PLAN_JSON: {plan_json}\n"
+        f"- KB_SNIPPETS (optional):\n{kb_block}"
+    )
+
+def _build_messages(
+    spec_json: str,
+    plan: MissionPlan,
+    plan_json: str,
+    origin_hint: Optional[str],
+    kb_hits: Optional[List[dict]]
+) -> List[Message]:
+    return [
+        Message(role="system", content=_STATIC_SYSTEM_PROMPT),
+        Message(role="user", content=_dynamic_user_prompt(spec_json, plan, plan_json, origin_hint, kb_hits)),
+    ]
+
+def _compose_request(
+    plan: MissionPlan,
+    origin_hint: Optional[str],
+    kb_hits: Optional[List[dict]],
+    spec_dict: Dict[str, Any],
+    plan_dict: Dict[str, Any],
+) -> LLMRequest:
+    spec_json = orjson.dumps(spec_dict).decode()
+    plan_json = orjson.dumps(plan_dict).decode()
+    return LLMRequest(
+        messages=_build_messages(spec_json, plan, plan_json, origin_hint, kb_hits),
+        temperature=0.3,  # slightly higher temp for more natural narrative
     )
 
+async def ai_compose_concept_stream(
+    spec: RocketSpecDraft,
+    plan: MissionPlan,
+    origin_hint: Optional[str],
+    kb_hits: Optional[List[dict]] = None,
+    orch: Optional[Orchestrator] = None,
+    spec_dict: Optional[Dict[str, Any]] = None,
+    plan_dict: Optional[Dict[str, Any]] = None,
+    on_concept: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> AsyncIterator[str]:
+    """
+    Same prompt as ai_compose_concept(), but yields the raw JSON text in batched
+    deltas as the model produces it. Once the stream completes, on_concept() receives
+    the finalized concept (the same dict ai_compose_concept() would return).
+    """
+    spec_dict = spec_dict if spec_dict is not None else spec.model_dump(mode="json")
+    plan_dict = plan_dict if plan_dict is not None else plan.model_dump(mode="json")
+    cache = get_compose_cache()
+    key = cache.key(spec_dict, plan_dict, origin_hint, kb_hits)
+    cached = cache.get(key)
+    if cached is not None:
+        yield orjson.dumps(cached).decode()
+        if on_concept is not None:
+            on_concept(cached)
+        return
+
+    orch = orch or get_orchestrator()
+    req = _compose_request(plan, origin_hint, kb_hits, spec_dict, plan_dict)
+    parts: List[str] = []
+    async for delta in orch.generate_stream(req=req, schema=_SCHEMA_DICT, use_cache=False):
+        parts.append(delta)
+        yield delta
+    out = finalize_concept("".join(parts))
+    if out.get("note") != _PARSE_FAILED_NOTE:
+        cache.put(key, out)
+    if on_concept is not None:
+        on_concept(out)
+
 async def ai_compose_concept(
     spec: RocketSpecDraft,
     plan: MissionPlan,
     origin_hint: Optional[str],
-    kb_hits: Optional[List[dict]] = None
+    kb_hits: Optional[List[dict]] = None,
+    orch: Optional[Orchestrator] = None,
+    spec_dict: Optional[Dict[str, Any]] = None,
+    plan_dict: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     AI-only composition (OpenAI via Orchestrator).
-    Supports both async and sync Orchestrator.generate implementations.
+    Pass the app-wide Orchestrator to reuse its cache and connections, and
+    spec_dict/plan_dict (model_dump(mode="json")) when the caller already has them.
     """
-    orch = Orchestrator()
-    prompt = _build_prompt(spec, plan, origin_hint, kb_hits)
+    spec_dict = spec_dict if spec_dict is not None else spec.model_dump(mode="json")
+    plan_dict = plan_dict if plan_dict is not None else plan.model_dump(mode="json")
+    cache = get_compose_cache()
+    key = cache.key(spec_dict, plan_dict, origin_hint, kb_hits)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    # The compose cache replaces the Orchestrator's response cache here: it holds parsed
+    # concepts only, so a malformed reply is retried on the next identical request.
+    orch = orch or get_orchestrator()
+    req = _compose_request(plan, origin_hint, kb_hits, spec_dict, plan_dict)
+    # Structured outputs keep the reply to bare JSON; finalize_concept() still
+    # tolerates fences/prose from providers that ignore schema=.
+    res: LLMResponse = await orch.generate(req=req, schema=_SCHEMA_DICT, use_cache=False)
+    out = finalize_concept(res.text or "", res.model_name, res.usage)
+    if out.get("note") != _PARSE_FAILED_NOTE:
+        cache.put(key, out)
+    return out
 
-    res = orch.generate(prompt=prompt, temperature=0.3)  # slightly higher temp for more natural narrative
-    if inspect.isawaitable(res):
-        res = await res  # support async adapters
+_PARSE_FAILED_NOTE = "AI-Compose failed to return valid JSON"
 
-    # 'res' should now be dict-like with 'text', optionally 'usage' and 'model_name'
-    text_payload = res.get("text") if isinstance(res, dict) else str(res)
-    txt = _strip_code_fences(text_payload or "").strip()
+def finalize_concept(
+    text: str,
+    model_name: Optional[str] = None,
+    usage: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Parse the model's JSON text into the concept dict, filling defaults for missing keys.
+    """
+    txt = _strip_code_fences(text).strip()
 
     data = _safe_json_load(txt)
-    if data is None:
-        last_brace = txt.rfind("}")
-        if last_brace != -1:
-            data = _safe_json_load(txt[:last_brace+1])
 
     if data is None or not isinstance(data, dict):
         # Minimal skeleton if model returned malformed JSON
         out = {
-            "note": "AI-Compose failed to return valid JSON",
+            "note": _PARSE_FAILED_NOTE,
             "launch_sites": [],
             "lunar_sites": [],
             "bom": {"currency": "USD", "items": [], "total_est_cost": 0},
@@ -219,13 +347,12 @@ async def ai_compose_concept(
     out.setdefault("ops_checklist", [])
 
     # LLM metadata (so UI can show “Generated by ChatGPT …”)
-    llm = {}
-    if isinstance(res, dict):
-        if "model_name" in res:
-            llm["model"] = res["model_name"]
-        if "usage" in res:
-            llm["usage"] = res["usage"]
-        if llm:
-            out["llm"] = {"provider": "openai", **llm}
+    llm: Dict[str, Any] = {}
+    if model_name:
+        llm["model"] = model_name
+    if usage:
+        llm["usage"] = usage
+    if llm:
+        out["llm"] = {"provider": "openai", **llm}
 
     return out
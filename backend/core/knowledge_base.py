@@ -1,11 +1,13 @@
 ﻿from __future__ import annotations
+import threading
+from collections import Counter
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-import json
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Set
+import msgspec
 
 # --------- Data Models ---------
-class EngineSpec(BaseModel):
+# msgspec Structs: the whole file is parsed + validated in one C-level pass.
+class EngineSpec(msgspec.Struct, kw_only=True):
     stage: int
     type: str
     count: int
@@ -13,7 +15,7 @@ class EngineSpec(BaseModel):
     thrust_vac_kN: Optional[float] = None
     isp_s: Optional[float] = None
 
-class RocketSpec(BaseModel):
+class RocketSpec(msgspec.Struct, kw_only=True):
     id: str
     name: str
     manufacturer: Optional[str] = None
@@ -24,35 +26,99 @@ class RocketSpec(BaseModel):
     payload_leo_kg: Optional[float] = None
     payload_gto_kg: Optional[float] = None
     payload_tli_kg: Optional[float] = None
-    engines: List[EngineSpec] = Field(default_factory=list)
-    propellants: List[str] = Field(default_factory=list)
+    engines: List[EngineSpec] = []
+    propellants: List[str] = []
     reusable: Optional[bool] = None
     notes: Optional[str] = None
 
 # --------- Loader / Search ---------
+# Guards load() so concurrent first requests don't parse the file twice
+_LOAD_LOCK = threading.Lock()
+
+# Longest n-gram indexed per vocabulary word; longer tokens intersect their n-grams' word sets
+_GRAM = 3
+
 class KnowledgeBase:
     def __init__(self, data_path: Optional[Path] = None):
         root = Path(__file__).resolve().parents[2]
         self.data_path = data_path or (root / "data" / "aerospace_specs" / "rockets.json")
         self._cache: List[RocketSpec] = []
         self._by_id: Dict[str, RocketSpec] = {}
+        # Search index: lowercased haystack per rocket (by load position) + word -> positions
+        self._hay: List[str] = []
+        self._postings: Dict[str, Set[int]] = {}
+        # n-gram (1.._GRAM chars) -> vocabulary words containing it, for substring lookups
+        self._grams: Dict[str, Set[str]] = {}
+        self._mtime: Optional[float] = None
 
     def load(self) -> None:
-        if not self.data_path.exists():
-            raise FileNotFoundError(f"KB file not found: {self.data_path}")
-        with self.data_path.open("r", encoding="utf-8") as f:
-            raw = json.load(f)
-        self._cache = [RocketSpec(**item) for item in raw]
-        self._by_id = {r.id: r for r in self._cache}
+        """
+        (Re)load the KB file; a no-op while its mtime is unchanged.
+        """
+        try:
+            mtime = self.data_path.stat().st_mtime
+        except FileNotFoundError:
+            raise FileNotFoundError(f"KB file not found: {self.data_path}") from None
+        if mtime == self._mtime:
+            return
+        with _LOAD_LOCK:
+            if mtime == self._mtime:  # another thread loaded it while we waited
+                return
+            cache = msgspec.json.decode(self.data_path.read_bytes(), type=List[RocketSpec])
+            self._cache = cache
+            self._by_id = {r.id: r for r in cache}
+            self._build_index()
+            self._mtime = mtime
+
+    def _build_index(self) -> None:
+        self._hay = [
+            " ".join([
+                r.id or "",
+                r.name or "",
+                r.manufacturer or "",
+                " ".join(r.propellants or []),
+                r.notes or ""
+            ]).lower()
+            for r in self._cache
+        ]
+        postings: Dict[str, Set[int]] = {}
+        for i, hay in enumerate(self._hay):
+            for word in hay.split():
+                postings.setdefault(word, set()).add(i)
+        grams: Dict[str, Set[str]] = {}
+        for word in postings:
+            for n in range(1, min(_GRAM, len(word)) + 1):
+                for j in range(len(word) - n + 1):
+                    grams.setdefault(word[j:j + n], set()).add(word)
+        self._postings = postings
+        self._grams = grams
+
+    def _words_containing(self, token: str) -> Set[str]:
+        """
+        Vocabulary words that contain `token`. Tokens up to _GRAM chars are indexed directly;
+        longer ones are checked only against the words that share all of their n-grams.
+        """
+        if len(token) <= _GRAM:
+            return self._grams.get(token, set())
+        sets = sorted(
+            (self._grams.get(token[j:j + _GRAM], set()) for j in range(len(token) - _GRAM + 1)),
+            key=len,
+        )
+        return {w for w in sets[0].intersection(*sets[1:]) if token in w}
+
+    def _candidates(self, token: str) -> Set[int]:
+        """
+        Rockets whose haystack contains `token` as a substring. A whitespace-free token can only
+        occur inside a single word, so the matching words' postings cover every hit.
+        """
+        return set().union(*(self._postings[w] for w in self._words_containing(token)))
 
     def all(self) -> List[RocketSpec]:
-        if not self._cache:
-            self.load()
+        self.load()
         return list(self._cache)
 
     def get(self, rocket_id: str) -> Optional[RocketSpec]:
-        if not self._by_id:
-            self.load()
+        self.load()
         return self._by_id.get(rocket_id)
 
     def search(self, q: str, limit: int = 10) -> List[RocketSpec]:
@@ -60,28 +126,27 @@ class KnowledgeBase:
         Super simple keyword search across id/name/manufacturer/notes/propellants.
         Case-insensitive; returns up to 'limit' matches, ordered by a naive score.
         """
-        if not self._cache:
-            self.load()
+        self.load()
         ql = q.lower().strip()
         if not ql:
             return []
-        scored: List[tuple[int, RocketSpec]] = []
-        for r in self._cache:
-            hay = " ".join([
-                r.id or "",
-                r.name or "",
-                r.manufacturer or "",
-                " ".join(r.propellants or []),
-                r.notes or ""
-            ]).lower()
+        tokens = ql.split()
+        candidates: Set[int] = set()
+        for token in set(tokens):
+            candidates |= self._candidates(token)
+
+        # Same scoring as a full scan (phrase hits + per-token hits), but only over candidates
+        scores: Counter[int] = Counter()
+        for i in candidates:
+            hay = self._hay[i]
             score = hay.count(ql)
             # lightweight additional hits on tokens
-            for token in ql.split():
+            for token in tokens:
                 score += hay.count(token)
             if score > 0:
-                scored.append((score, r))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [r for _, r in scored[:limit]]
+                scores[i] = score
+        ranked = sorted(scores, key=lambda i: (-scores[i], i))
+        return [self._cache[i] for i in ranked[:limit]]
 
 # Singleton-ish access
 _kb = KnowledgeBase()
@@ -90,18 +155,32 @@ def get_kb() -> KnowledgeBase:
     return _kb
 
 # --------- Optional: prompt helper for LLM grounding ---------
+_BRIEF_TMPL = (
+    "{name} by {manufacturer} — stages={stages}, H={height_m} m, D={diameter_m} m, "
+    "liftoff mass={liftoff_mass_t} t, payloads({payloads}); engines: {engines}; "
+    "propellants: {propellants}. Reusable={reusable}. Notes: {notes}"
+)
+_ENGINE_TMPL = "Stage {}: {}× {} (Isp={} s)"
+
+def _fmt_engine(e: EngineSpec) -> str:
+    return _ENGINE_TMPL.format(e.stage, e.count, e.type, e.isp_s or "n/a")
+
 def format_rocket_brief(r: RocketSpec) -> str:
-    engines_str = "; ".join(
-        [f"Stage {e.stage}: {e.count}× {e.type} (Isp={e.isp_s or 'n/a'} s)" for e in r.engines]
-    )
-    payloads = []
-    if r.payload_leo_kg: payloads.append(f"LEO={r.payload_leo_kg} kg")
-    if r.payload_gto_kg: payloads.append(f"GTO={r.payload_gto_kg} kg")
-    if r.payload_tli_kg: payloads.append(f"TLI={r.payload_tli_kg} kg")
-    payload_str = ", ".join(payloads) if payloads else "n/a"
-    return (
-        f"{r.name} by {r.manufacturer or 'n/a'} — stages={r.stages}, "
-        f"H={r.height_m} m, D={r.diameter_m} m, liftoff mass={r.liftoff_mass_t} t, "
-        f"payloads({payload_str}); engines: {engines_str}; propellants: {', '.join(r.propellants)}. "
-        f"Reusable={r.reusable}. Notes: {r.notes or '—'}"
-    )
+    payloads = ", ".join(
+        f"{label}={kg} kg"
+        for label, kg in (("LEO", r.payload_leo_kg), ("GTO", r.payload_gto_kg), ("TLI", r.payload_tli_kg))
+        if kg
+    ) or "n/a"
+    return _BRIEF_TMPL.format_map({
+        "name": r.name,
+        "manufacturer": r.manufacturer or "n/a",
+        "stages": r.stages,
+        "height_m": r.height_m,
+        "diameter_m": r.diameter_m,
+        "liftoff_mass_t": r.liftoff_mass_t,
+        "payloads": payloads,
+        "engines": "; ".join(map(_fmt_engine, r.engines)),
+        "propellants": ", ".join(r.propellants),
+        "reusable": r.reusable,
+        "notes": r.notes or "—",
+    })
@@ -0,0 +1,234 @@
+﻿from __future__ import annotations
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import msgspec
+
+from backend.core.types import LLMRequest, LLMResponse
+
+# Optional deps: semantic matching needs numpy + sentence-transformers.
+# Without them the cache still serves exact-match hits.
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    _HAS_EMBEDDER = True
+except Exception:
+    np = None  # type: ignore[assignment]
+    SentenceTransformer = None  # type: ignore[assignment]
+    _HAS_EMBEDDER = False
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Config ----------------
+EMBED_MODEL = os.getenv("AERO_LLM_CACHE_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SIM_THRESHOLD = float(os.getenv("AERO_LLM_CACHE_THRESHOLD", "0.92"))
+CACHE_TTL_S = int(os.getenv("AERO_LLM_CACHE_TTL_S", "3600"))
+MAX_ENTRIES = int(os.getenv("AERO_LLM_CACHE_MAX_ENTRIES", "512"))
+# int8 dynamic quantization of the encoder's Linear layers (CPU): ~2x faster encode
+QUANTIZE_EMBEDDER = os.getenv("AERO_LLM_CACHE_QUANTIZE", "1") == "1"
+# Exact-match hits are only served for (near-)deterministic calls.
+EXACT_MAX_TEMPERATURE = float(os.getenv("AERO_LLM_CACHE_EXACT_MAX_TEMP", "0.5"))
+
+
+def _semantic_key(scope: str, req: LLMRequest) -> Tuple[str, str]:
+    """
+    (context key, query text) for semantic matching. Only the last user message is embedded:
+    MiniLM truncates around 256 tokens, so embedding a long shared static prefix would make
+    every prompt look alike. Every other message has to match exactly, via the hashed context key.
+    """
+    msgs = req.messages
+    i = next((j for j in range(len(msgs) - 1, -1, -1) if msgs[j].role == "user"), len(msgs) - 1)
+    h = hashlib.sha256(scope.encode("utf-8"))
+    for j, m in enumerate(msgs):
+        if j != i:
+            h.update(f"\x00{m.role}\x00{m.content}".encode("utf-8"))
+    return h.hexdigest(), (msgs[i].content if msgs else "")
+
+
+class ExactPromptCache:
+    """
+    O(1) LRU keyed by SHA-256 of the canonical (model, messages, temperature, max_tokens) JSON.
+    Responses are stored as serialized LLMResponse JSON so cached objects can't be mutated by callers.
+    """
+
+    def __init__(self, ttl_s: int = CACHE_TTL_S, max_entries: int = MAX_ENTRIES):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    @staticmethod
+    def key(model: str, req: LLMRequest) -> str:
+        h = hashlib.sha256(model.encode("utf-8"))
+        h.update(b"\x00")
+        h.update(req.canonical_json().encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, model: str, req: LLMRequest) -> Optional[LLMResponse]:
+        k = self.key(model, req)
+        hit = self._data.get(k)
+        if hit is None:
+            return None
+        ts, blob = hit
+        if time.time() - ts > self.ttl_s:
+            del self._data[k]
+            return None
+        self._data.move_to_end(k)
+        return msgspec.json.decode(blob, type=LLMResponse)
+
+    def put(self, model: str, req: LLMRequest, resp: LLMResponse) -> None:
+        k = self.key(model, req)
+        self._data[k] = (time.time(), msgspec.json.encode(resp))
+        self._data.move_to_end(k)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class SemanticLLMCache:
+    """
+    Response cache in front of the LLM adapters.
+    - Exact-match fast path: ExactPromptCache (SHA-256 over canonical request JSON)
+    - Semantic path: cosine similarity of MiniLM embeddings of the last user message (one GEMV
+      over all keys), among entries whose other messages match exactly
+    Entries are scoped by provider/model so answers never leak across models.
+    Embedding runs on a worker thread so cache lookups don't block the event loop.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SIM_THRESHOLD,
+        ttl_s: int = CACHE_TTL_S,
+        max_entries: int = MAX_ENTRIES,
+        model_name: str = EMBED_MODEL,
+    ):
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.model_name = model_name
+        self._encoder: Any = None
+        # Set when the encoder can't be loaded (e.g. offline host); semantic matching is then skipped
+        self._encoder_failed = False
+        self.exact = ExactPromptCache(ttl_s=ttl_s, max_entries=max_entries)
+        # Parallel arrays: row i of _emb belongs to _entries[i] = (ts, context key, response)
+        self._entries: List[Tuple[float, str, LLMResponse]] = []
+        self._emb: Any = None
+
+    # ---------- embedding ----------
+    @property
+    def semantic_enabled(self) -> bool:
+        return _HAS_EMBEDDER and not self._encoder_failed
+
+    def _get_encoder(self) -> Any:
+        if self._encoder is None and not self._encoder_failed:
+            try:
+                self._encoder = self._load_encoder()
+            except Exception:
+                logger.warning(
+                    "Semantic cache encoder %s failed to load; serving exact-match hits only",
+                    self.model_name, exc_info=True,
+                )
+                self._encoder_failed = True
+        return self._encoder
+
+    def _load_encoder(self) -> Any:
+        import torch  # installed with sentence-transformers
+
+        torch.set_num_threads(os.cpu_count() or 1)
+        model = SentenceTransformer(self.model_name, device="cpu")
+        model.eval()
+        if QUANTIZE_EMBEDDER:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    def warm(self) -> Any:
+        """
+        Load the encoder ahead of the first request (called from the app lifespan).
+        Returns the encoder, or None when semantic matching is unavailable or fails to load.
+        """
+        if not self.semantic_enabled:
+            return None
+        encoder = self._get_encoder()
+        if encoder is None:
+            return None
+        try:
+            encoder.encode("warmup", normalize_embeddings=True)
+        except Exception:
+            logger.warning("Semantic cache encoder warmup failed; serving exact-match hits only", exc_info=True)
+            self._encoder_failed = True
+            return None
+        return encoder
+
+    def _embed(self, text: str) -> Any:
+        """Normalized float32 embedding, or None when the encoder is unavailable."""
+        encoder = self._get_encoder()
+        if encoder is None:
+            return None
+        return encoder.encode(text, normalize_embeddings=True).astype(np.float32)
+
+    # ---------- housekeeping ----------
+    def _expired(self, ts: float, now: float) -> bool:
+        return now - ts > self.ttl_s
+
+    def _evict(self, now: float) -> None:
+        if self._emb is None:
+            return
+        keep = [i for i, (ts, _, _) in enumerate(self._entries) if not self._expired(ts, now)]
+        keep = keep[-self.max_entries:]
+        if len(keep) != len(self._entries):
+            self._entries = [self._entries[i] for i in keep]
+            self._emb = self._emb[keep] if keep else None
+
+    # ---------- public API ----------
+    async def get(self, scope: str, req: LLMRequest, semantic: bool = True) -> Optional[LLMResponse]:
+        hit = self.exact.get(scope, req)
+        if hit is not None:
+            return hit
+
+        if not semantic or not self.semantic_enabled or self._emb is None:
+            return None
+        ctx, query = _semantic_key(scope, req)
+        q = await asyncio.to_thread(self._embed, query)
+        if q is None or self._emb is None:
+            return None
+        now = time.time()
+        scores = self._emb @ q
+        for i in np.argsort(scores)[::-1]:
+            if scores[i] < self.threshold:
+                break
+            ts, entry_ctx, resp = self._entries[i]
+            if entry_ctx == ctx and not self._expired(ts, now):
+                return msgspec.structs.replace(resp, usage=dict(resp.usage))
+        return None
+
+    async def put(self, scope: str, req: LLMRequest, resp: LLMResponse, semantic: bool = True) -> None:
+        self.exact.put(scope, req, resp)
+
+        if semantic and self.semantic_enabled:
+            ctx, query = _semantic_key(scope, req)
+            e = await asyncio.to_thread(self._embed, query)
+            if e is None:
+                return
+            e = e[None, :]
+            now = time.time()
+            self._emb = e if self._emb is None else np.vstack([self._emb, e])
+            self._entries.append((now, ctx, resp))
+            self._evict(now)
+
+    def clear(self) -> None:
+        self.exact.clear()
+        self._entries = []
+        self._emb = None
+
+
+# Singleton-ish access
+_cache = SemanticLLMCache()
+
+def get_llm_cache() -> SemanticLLMCache:
+    return _cache
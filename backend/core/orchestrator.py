@@ -1,53 +1,69 @@
 ﻿from __future__ import annotations
+import asyncio
 import os
-from typing import Dict, Optional, Union
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple, Union
+
+import httpx
 
 from backend.adapters.base_adapter import BaseAdapter
 from backend.adapters.gpt_adapter import OpenAIAdapter
 from backend.core.types import LLMRequest, LLMResponse, Message
+from backend.core.llm_cache import EXACT_MAX_TEMPERATURE, SemanticLLMCache, get_llm_cache
+from backend.core.streaming import batched_stream
 from backend.adapters.claude_adapter import ClaudeAdapter
 
 
+# provider -> adapter factory(model, shared http client)
+_BUILDERS: Dict[str, Callable[[str, Optional[httpx.AsyncClient]], BaseAdapter]] = {
+    "openai": lambda model, http: OpenAIAdapter(model=model, http_client=http),
+    "claude": lambda model, http: ClaudeAdapter(model=model, client=http),
+}
+
+# Adapter kwargs that don't change what the model says
+_CACHE_NEUTRAL_KWARGS = frozenset({"schema"})
+
+
 class Orchestrator:
     """
     Selects an adapter by provider/model and forwards normalized requests.
-    Extend with more providers (e.g., ClaudeAdapter, LlamaAdapter) in _get_adapter().
+    Extend with more providers (e.g., LlamaAdapter) by adding a factory to _BUILDERS.
     """
 
-    def __init__(self, default_provider: Optional[str] = None, default_model: Optional[str] = None):
+    def __init__(
+        self,
+        default_provider: Optional[str] = None,
+        default_model: Optional[str] = None,
+        cache: Optional[SemanticLLMCache] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
         self.default_provider = (default_provider or os.getenv("DEFAULT_PROVIDER", "openai")).lower()
         self.default_model = default_model or os.getenv("DEFAULT_MODEL", "gpt-4o-mini")
+        self.cache = cache if cache is not None else get_llm_cache()
+        # Shared connection pool handed to HTTP-based adapters
+        self.http_client = http_client
+        # Adapters are built once per (provider, model) and reused across requests
+        self._adapters: Dict[Tuple[str, str], BaseAdapter] = {}
 
     def _get_adapter(self, provider: Optional[str] = None, model: Optional[str] = None) -> BaseAdapter:
         provider = (provider or self.default_provider).lower()
         model = model or self.default_model
-        
-        if provider == "claude":
-            return ClaudeAdapter(model=model)
 
+        adapter = self._adapters.get((provider, model))
+        if adapter is None:
+            builder = _BUILDERS.get(provider)
+            if builder is None:
+                raise ValueError(f"Unknown provider: {provider}")
+            adapter = self._adapters[(provider, model)] = builder(model, self.http_client)
+        return adapter
 
-        if provider == "openai":
-            return OpenAIAdapter(model=model)  # expects/returns LLMRequest/LLMResponse
-
-        raise ValueError(f"Unknown provider: {provider}")
-
-    async def generate(
+    def _normalize_request(
         self,
-        req: Optional[Union[LLMRequest, str]] = None,   # preferred structured request, or a plain string
+        req: Optional[Union[LLMRequest, str]],
         *,
-        prompt: Optional[str] = None,                   # explicit plain prompt
-        temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None,
-        provider: Optional[str] = None,
-        model: Optional[str] = None,
-        **kwargs
-    ) -> LLMResponse:
-        """
-        Accepts either an LLMRequest (req) or a plain prompt string.
-        Always forwards an LLMRequest to the adapter and returns LLMResponse.
-        """
-        adapter = self._get_adapter(provider=provider, model=model)
-
+        prompt: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+    ) -> LLMRequest:
         # Normalize into LLMRequest
         if isinstance(req, LLMRequest):
             final_req = req
@@ -71,9 +87,126 @@ class Orchestrator:
             )
         else:
             raise ValueError("No prompt text provided to Orchestrator.generate().")
+        return final_req
+
+    def _cache_policy(
+        self, req: LLMRequest, adapter: BaseAdapter, provider: Optional[str], kwargs: Dict[str, Any]
+    ) -> Tuple[bool, bool, str]:
+        """
+        Returns (cacheable, semantic, scope).
+        Exact hits are fine for near-deterministic calls; semantic hits only at temperature 0.
+        The built-in callers run at 0.2-0.3, so the semantic tier only serves /ai/chat clients
+        that ask for temperature=0.
+        Extra adapter kwargs may change the output, so those calls always go to the provider;
+        schema= only pins the output format, so it doesn't affect cacheability.
+        """
+        temp = req.temperature
+        cacheable = temp is not None and temp <= EXACT_MAX_TEMPERATURE and kwargs.keys() <= _CACHE_NEUTRAL_KWARGS
+        semantic = cacheable and temp <= 0
+        scope = f"{(provider or self.default_provider).lower()}:{adapter.model}"
+        return cacheable, semantic, scope
+
+    async def generate(
+        self,
+        req: Optional[Union[LLMRequest, str]] = None,   # preferred structured request, or a plain string
+        *,
+        prompt: Optional[str] = None,                   # explicit plain prompt
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        use_cache: bool = True,
+        **kwargs
+    ) -> LLMResponse:
+        """
+        Accepts either an LLMRequest (req) or a plain prompt string.
+        Always forwards an LLMRequest to the adapter and returns LLMResponse.
+        use_cache=False bypasses the response cache for callers that cache parsed results themselves.
+        """
+        adapter = self._get_adapter(provider=provider, model=model)
+        final_req = self._normalize_request(req, prompt=prompt, temperature=temperature, max_tokens=max_tokens)
+
+        cacheable, semantic, scope = self._cache_policy(final_req, adapter, provider, kwargs)
+        cacheable = cacheable and use_cache
+        if cacheable:
+            cached = await self.cache.get(scope, final_req, semantic=semantic)
+            if cached is not None:
+                return cached
 
         # Call the adapter; it must accept LLMRequest and return LLMResponse
-        return await adapter.generate(final_req, **kwargs)
+        resp = await adapter.generate(final_req, **kwargs)
+        if cacheable:
+            await self.cache.put(scope, final_req, resp, semantic=semantic)
+        return resp
+
+    async def generate_stream(
+        self,
+        req: Optional[Union[LLMRequest, str]] = None,
+        *,
+        prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        use_cache: bool = True,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Same inputs as generate(), but yields text deltas as the provider streams them.
+        Cache hits are replayed as a single chunk; misses are stored once the stream completes.
+        Deltas are coalesced with batched_stream() so the HTTP layer sees one event per window.
+        """
+        adapter = self._get_adapter(provider=provider, model=model)
+        final_req = self._normalize_request(req, prompt=prompt, temperature=temperature, max_tokens=max_tokens)
+
+        cacheable, semantic, scope = self._cache_policy(final_req, adapter, provider, kwargs)
+        cacheable = cacheable and use_cache
+        if cacheable:
+            cached = await self.cache.get(scope, final_req, semantic=semantic)
+            if cached is not None:
+                yield cached.text
+                return
+
+        parts = []
+        async for delta in batched_stream(adapter.generate_stream(final_req, **kwargs)):
+            parts.append(delta)
+            yield delta
+        if cacheable:
+            resp = LLMResponse(text="".join(parts), model_name=adapter.model)
+            await self.cache.put(scope, final_req, resp, semantic=semantic)
+
+    async def aclose(self) -> None:
+        """
+        Release pooled provider connections (called on app shutdown).
+        """
+        await asyncio.gather(OpenAIAdapter.aclose(), ClaudeAdapter.aclose())
 
     def info(self) -> Dict[str, str]:
         return {"default_provider": self.default_provider, "default_model": self.default_model}
+
+    async def health(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Check every adapter built so far concurrently, as {provider: {model: status}};
+        total wait is the slowest adapter, not the sum. Failures report status=error.
+        Providers that haven't served a request yet are not listed (nothing is built here).
+        """
+        adapters = list(self._adapters.items())
+        results = await asyncio.gather(*(a.health() for _, a in adapters), return_exceptions=True)
+        out: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for ((provider, model), _), r in zip(adapters, results):
+            out.setdefault(provider, {})[model] = (
+                {"status": "error", "detail": str(r)} if isinstance(r, BaseException) else r
+            )
+        return out
+
+
+_orch: Optional[Orchestrator] = None
+
+def get_orchestrator() -> Orchestrator:
+    """
+    Process-wide Orchestrator for callers outside a request (the API uses app.state.orch).
+    """
+    global _orch
+    if _orch is None:
+        _orch = Orchestrator()
+    return _orch
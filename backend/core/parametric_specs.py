@@ -1,10 +1,12 @@
 ﻿from __future__ import annotations
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Mapping, Tuple
 from pydantic import BaseModel, Field
 from enum import Enum  # <-- add this import near the top
 from enum import Enum
 from pydantic import BaseModel, Field
 import math
+import sys
+from types import MappingProxyType
 
 # ------------------ Models ------------------
 class EstimateOverrides(BaseModel):
@@ -42,12 +44,17 @@ class RocketSpecDraft(BaseModel):
     notes: str
 
 # ------------------ Heuristics ------------------
-# Simple ISP lookup
-ISP_TABLE = {
-    "RP1/LOX": 300.0,    # blended sea-level/vac average for small launchers
-    "LH2/LOX": 430.0,    # vacuum-ish for upper stage concept
-    "Solid":   270.0,
-}
+# Canonical propellant names, interned so table lookups hit the identity fast path
+_RP1_LOX = sys.intern("RP1/LOX")
+_LH2_LOX = sys.intern("LH2/LOX")
+_SOLID = sys.intern("Solid")
+
+# Simple ISP lookup (read-only)
+ISP_TABLE: Mapping[str, float] = MappingProxyType({
+    _RP1_LOX: 300.0,    # blended sea-level/vac average for small launchers
+    _LH2_LOX: 430.0,    # vacuum-ish for upper stage concept
+    _SOLID:   270.0,
+})
 
 def guess_stage_count(bboxes: List[BoundingBox]) -> int:
     # If we have multiple stacked rectangles/circles, infer 2–3 stages; else default 2
@@ -59,37 +66,50 @@ def px_extents(bboxes: List[BoundingBox]) -> Tuple[float, float]:
     """Return (height_px, diameter_px) from all boxes."""
     if not bboxes:
         return 200.0, 20.0  # default if nothing drawn
-    top = min(bb.top for bb in bboxes)
-    bottom = max(bb.top + bb.height for bb in bboxes)
+    # Single pass over the boxes
+    first = bboxes[0]
+    top, bottom, width = first.top, first.top + first.height, first.width
+    for bb in bboxes[1:]:
+        if bb.top < top:
+            top = bb.top
+        if bb.top + bb.height > bottom:
+            bottom = bb.top + bb.height
+        if bb.width > width:
+            width = bb.width
     height_px = max(1.0, bottom - top)
-    diameter_px = max(1.0, max(bb.width for bb in bboxes))
+    diameter_px = max(1.0, width)
     return height_px, diameter_px
 
-def split_lengths(total_h_m: float, n: int) -> List[float]:
+# Per-stage-count tables (n -> one entry per stage), shared and never mutated
+_LEN_SPLITS: Dict[int, Tuple[float, ...]] = {
+    1: (1.0,),
+    2: (0.65, 0.35),
+    3: (0.55, 0.30, 0.15),
+}
+_PROPS: Dict[int, Tuple[str, ...]] = {
+    1: (_RP1_LOX,),
+    2: (_RP1_LOX, _LH2_LOX),               # kerolox booster, hydrolox upper
+    3: (_RP1_LOX, _RP1_LOX, _LH2_LOX),
+}
+_FRAC: Dict[int, Tuple[Tuple[float, float], ...]] = {
+    1: ((0.10, 0.80),),
+    2: ((0.08, 0.86), (0.10, 0.80)),
+    3: ((0.08, 0.86), (0.09, 0.84), (0.10, 0.78)),
+}
+
+def split_lengths(total_h_m: float, n: int) -> Tuple[float, ...]:
     """Split height across stages (e.g., 65/35 for 2 stages; 55/30/15 for 3)."""
-    if n == 2:
-        return [total_h_m * 0.65, total_h_m * 0.35]
-    if n == 3:
-        return [total_h_m * 0.55, total_h_m * 0.30, total_h_m * 0.15]
-    return [total_h_m]
-
-def choose_propellants(n: int) -> List[str]:
-    if n == 2:
-        return ["RP1/LOX", "LH2/LOX"]   # kerolox booster, hydrolox upper
-    if n == 3:
-        return ["RP1/LOX", "RP1/LOX", "LH2/LOX"]
-    return ["RP1/LOX"]
-
-def mass_fractions_for_small_lifter(n: int) -> List[Tuple[float, float]]:
+    return tuple(total_h_m * f for f in _LEN_SPLITS.get(n, _LEN_SPLITS[1]))
+
+def choose_propellants(n: int) -> Tuple[str, ...]:
+    return _PROPS.get(n, _PROPS[1])
+
+def mass_fractions_for_small_lifter(n: int) -> Tuple[Tuple[float, float], ...]:
     """
-    Return list of (structural_fraction, propellant_fraction) per stage.
+    Return (structural_fraction, propellant_fraction) per stage.
     Very rough ballparks for a small launcher.
     """
-    if n == 2:
-        return [(0.08, 0.86), (0.10, 0.80)]
-    if n == 3:
-        return [(0.08, 0.86), (0.09, 0.84), (0.10, 0.78)]
-    return [(0.10, 0.80)]
+    return _FRAC.get(n, _FRAC[1])
 
 def estimate_liftoff_mass(height_m: float, diameter_m: float) -> float:
     """
@@ -118,7 +138,7 @@ def estimate_specs(sketch: SketchMeta, scale_m_per_px: float, overrides: Estimat
     stage_lengths = split_lengths(height_m, n)
     props = choose_propellants(n)
     if overrides.preferred_upper_propellant and n >= 2:
-        props[-1] = overrides.preferred_upper_propellant  # upper stage preference
+        props = props[:-1] + (overrides.preferred_upper_propellant,)  # upper stage preference
     isps = [ISP_TABLE.get(p, 300.0) for p in props]
     frac = mass_fractions_for_small_lifter(n)
 
@@ -133,39 +153,34 @@ def estimate_specs(sketch: SketchMeta, scale_m_per_px: float, overrides: Estimat
         payload_leo_kg = max(50.0, 0.0025 * liftoff_mass_kg)
 
     # 4) distribute mass by stage roughly proportional to length
-    length_sum = sum(stage_lengths)
-    stage_masses = [liftoff_mass_kg * (L/length_sum) for L in stage_lengths]
+    mass_per_m = liftoff_mass_kg / sum(stage_lengths)
+    stage_masses = [mass_per_m * L for L in stage_lengths]
+
+    # thrust target: first stage lifts the full stack, uppers sized lighter for their own mass
+    thrusts = [thrust_for_twr(liftoff_mass_kg, 1.4)] + [thrust_for_twr(m, 0.9) for m in stage_masses[1:]]
+    upper_d = 0.6 * diameter_m
+    diameters = [diameter_m] + [upper_d] * (n - 1)
 
     stages: List[StageEstimate] = []
     max_d = diameter_m
-    for i in range(n):
-        s_mass = stage_masses[i]
-        sf, pf = frac[i]
-        structural = s_mass * sf
-        propellant = s_mass * pf
-        isp = isps[i]
-        prop = props[i]
-
-        # thrust target: ensure first stage can lift full stack, uppers sized lighter
-        if i == 0:
-            target_mass_for_thrust = liftoff_mass_kg
-        else:
-            target_mass_for_thrust = s_mass
-        thrust_kN = thrust_for_twr(target_mass_for_thrust, 1.4 if i == 0 else 0.9)
-
-        stages.append(StageEstimate(
+    for i, (L, s_mass, (sf, pf), prop, isp, d, thrust_kN) in enumerate(
+        zip(stage_lengths, stage_masses, frac, props, isps, diameters, thrusts)
+    ):
+        stages.append(StageEstimate.model_construct(
             stage=i+1,
-            length_m=stage_lengths[i],
-            diameter_m=diameter_m if i == 0 else max(0.6*diameter_m, 0.5*diameter_m),
+            length_m=L,
+            diameter_m=d,
             propellant=prop,
             isp_s=isp,
-            structural_mass_kg=structural,
-            propellant_mass_kg=propellant,
+            structural_mass_kg=s_mass * sf,
+            propellant_mass_kg=s_mass * pf,
             engine_thrust_kN=thrust_kN
         ))
 
     notes = "Heuristic draft from canvas bounds and user scale. Tune in UI and rerun."
-    return RocketSpecDraft(
+    # Every field above is computed here with the right type, so skip re-validation.
+    # Models built from request bodies still go through normal validation.
+    return RocketSpecDraft.model_construct(
         stages=stages,
         total_height_m=height_m,
         max_diameter_m=max_d,
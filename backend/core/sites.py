@@ -1,15 +1,50 @@
 ﻿from __future__ import annotations
-import json, math, os
+import json, math, os, re
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Any, Dict, List, Optional, Tuple
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "sites")
+import numpy as np
+
+# <repo>/data/sites (same root as the KB's data/aerospace_specs)
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(_ROOT, "data", "sites")
 
 def _load_json(name: str) -> List[Dict[str, Any]]:
     with open(os.path.join(DATA_DIR, name), "r", encoding="utf-8") as f:
         return json.load(f)
 
+def _site_arrays(sites: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Per-site arrays that don't depend on the request (parallel to `sites`).
+    """
+    # (N, 2) lat/lon in radians; sites without coordinates are NaN (no distance)
+    latlon_rad = np.radians(np.array(
+        [[s.get("lat_deg", np.nan), s.get("lon_deg", np.nan)] for s in sites],
+        dtype=np.float64,
+    ).reshape(-1, 2))
+    lat_abs = np.abs(np.array([float(s.get("lat_deg", 0)) for s in sites], dtype=np.float64))
+    return {
+        "latlon_rad": latlon_rad,
+        "low_lat_bonus": np.clip((30.0 - lat_abs) / 30.0, 0.0, None),  # 0..1 (best near equator)
+        "vertical": np.array([s.get("type") == "vertical" for s in sites], dtype=np.float64),
+        "licensed": np.array([bool(s.get("faa_licensed")) for s in sites], dtype=np.float64),
+    }
+
 LAUNCH_SITES = _load_json("launch_sites.json")
 LUNAR_SITES  = _load_json("lunar_sites.json")
+_SITE_ARRAYS = _site_arrays(LAUNCH_SITES)
+
+# Read-only views of the site records; ranked rows overlay score/distance on these
+_SITE_BASE = tuple(MappingProxyType(s) for s in LAUNCH_SITES)
+
+_SITE_LATLON_RAD = _SITE_ARRAYS["latlon_rad"]
+_VERTICAL = _SITE_ARRAYS["vertical"]
+_NON_VERTICAL = (_VERTICAL == 0).astype(np.int8)  # primary sort key: vertical pads first
+# Mission-independent part of score_site_for_mission()
+_SITE_SCORE_BASE = 0.6*_SITE_ARRAYS["low_lat_bonus"] + 0.3*_VERTICAL + 0.1*_SITE_ARRAYS["licensed"]
+
+EARTH_RADIUS_KM = 6371.0
 
 # very small state centroid map (expand as needed)
 STATE_CENTROIDS = {
@@ -30,6 +65,13 @@ CITY_HINTS = {
     "wallops": (37.84, -75.49)
 }
 
+# One alternation over every city/state key (longest first), so a hint is scanned once
+_HINTS: Dict[str, Tuple[Tuple[float, float], bool]] = {
+    **{k: (v, False) for k, v in STATE_CENTROIDS.items()},
+    **{k: (v, True) for k, v in CITY_HINTS.items()},
+}
+_HINT_RE = re.compile("|".join(re.escape(k) for k in sorted(_HINTS, key=len, reverse=True)))
+
 def haversine_km(a: Tuple[float,float], b: Tuple[float,float]) -> float:
     from math import radians, sin, cos, sqrt, asin
     R = 6371.0
@@ -39,23 +81,50 @@ def haversine_km(a: Tuple[float,float], b: Tuple[float,float]) -> float:
     x = sin(dlat/2)**2 + cos(lat1)*cos(lat2)*sin(dlon/2)**2
     return 2*R*asin(sqrt(x))
 
+def haversine_km_vec(origin_rad: np.ndarray, sites_rad: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distances (km) from one (lat, lon) point to every row of an (N, 2) array, all in radians.
+    """
+    R = EARTH_RADIUS_KM
+    lat1, lon1 = origin_rad[0], origin_rad[1]
+    lat2, lon2 = sites_rad[:, 0], sites_rad[:, 1]
+    x = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * R * np.arcsin(np.sqrt(x))
+
+def equirect_d2_vec(origin_rad: np.ndarray, sites_rad: np.ndarray) -> np.ndarray:
+    """
+    Squared equirectangular distance (radians^2) from one (lat, lon) point to every row of an
+    (N, 2) array. One cos per call instead of per site; ranks like haversine at regional scales.
+    Only for ordering: it is badly off for far-apart pairs, so shown distances use haversine.
+    """
+    lat0, lon0 = origin_rad[0], origin_rad[1]
+    dlat = sites_rad[:, 0] - lat0
+    dlon = np.remainder(sites_rad[:, 1] - lon0 + np.pi, 2 * np.pi) - np.pi  # wrap across the antimeridian
+    return dlat * dlat + (math.cos(lat0) * dlon) ** 2
+
 def infer_origin_coords(origin_hint: Optional[str]) -> Optional[Tuple[float,float,str]]:
     if not origin_hint:
         return None
-    h = origin_hint.strip().lower()
-    # exact city hits
-    for k, v in CITY_HINTS.items():
-        if k in h:
-            return (v[0], v[1], k)
-    # state-level hits
-    for k, v in STATE_CENTROIDS.items():
-        if k in h.split():
-            return (v[0], v[1], k)
-    # fallback: try loose contains
-    for k, v in STATE_CENTROIDS.items():
-        if k in h:
-            return (v[0], v[1], k)
-    return None
+    return _infer_origin_coords_cached(origin_hint.strip().lower())
+
+@lru_cache(maxsize=512)
+def _infer_origin_coords_cached(h: str) -> Optional[Tuple[float,float,str]]:
+    best: Optional[Tuple[Tuple[int, int, int], str]] = None
+    for m in _HINT_RE.finditer(h):
+        k = m.group()
+        is_city = _HINTS[k][1]
+        start, end = m.span()
+        # whole whitespace-delimited word, as in h.split()
+        is_word = (start == 0 or h[start-1].isspace()) and (end == len(h) or h[end].isspace())
+        # city hits > state as a word > state inside a word; then longest, then leftmost
+        rank = (0 if is_city else 1 if is_word else 2, -len(k), start)
+        if best is None or rank < best[0]:
+            best = (rank, k)
+    if best is None:
+        return None
+    k = best[1]
+    lat, lon = _HINTS[k][0]
+    return (lat, lon, k)
 
 def score_site_for_mission(site: Dict[str,Any], target: str, payload_leo_kg: Optional[float]) -> float:
     """
@@ -71,23 +140,43 @@ def score_site_for_mission(site: Dict[str,Any], target: str, payload_leo_kg: Opt
     tli_bonus = 0.2 if target.upper() == "TLI" else 0.0
     return 0.6*low_lat_bonus + 0.3*vertical + 0.1*licensed + tli_bonus
 
-def nearest_and_best_sites(origin: Optional[Tuple[float,float,str]], target: str, payload_leo_kg: Optional[float]) -> List[Dict[str,Any]]:
-    rows = []
-    for s in LAUNCH_SITES:
-        row = dict(s)
-        row["score"] = score_site_for_mission(s, target, payload_leo_kg)
-        if origin:
-            row["distance_km"] = round(haversine_km((origin[0], origin[1]), (s["lat_deg"], s["lon_deg"])))
-        else:
-            row["distance_km"] = None
-        rows.append(row)
-    # sort: by vertical-only first for LEO/TLI, then score desc, then distance asc
-    rows.sort(key=lambda r: (
-        0 if r["type"]=="vertical" else 1,
-        -r["score"],
-        r["distance_km"] if r["distance_km"] is not None else 1e9
-    ))
-    return rows
+def nearest_and_best_sites(
+    origin: Optional[Tuple[float,float,str]],
+    target: str,
+    payload_leo_kg: Optional[float],
+    limit: Optional[int] = None,
+) -> List[Dict[str,Any]]:
+    """
+    Launch sites ranked for the mission, each with 'score' and 'distance_km' added.
+    Only the first `limit` rows (all if None) are materialized as dicts.
+    """
+    # Ranking doesn't use payload_leo_kg yet, so it stays out of the cache key.
+    ranked = _rank_sites(tuple(origin) if origin else None, target.upper())
+    if limit is not None:
+        ranked = ranked[:limit]
+    return [{**_SITE_BASE[i], "score": score, "distance_km": dist} for i, score, dist in ranked]
+
+@lru_cache(maxsize=256)
+def _rank_sites(origin: Optional[Tuple[float,float,str]], target: str) -> Tuple[Tuple[int, float, Optional[int]], ...]:
+    """(site index, score, distance_km) in rank order; immutable, so safe to share from the cache."""
+    # Same terms as score_site_for_mission(), for every site at once
+    tli_bonus = 0.2 if target == "TLI" else 0.0
+    scores = _SITE_SCORE_BASE + tli_bonus
+
+    if origin:
+        origin_rad = np.radians([origin[0], origin[1]])
+        d2 = equirect_d2_vec(origin_rad, _SITE_LATLON_RAD)
+        # Displayed distance is great-circle; the equirectangular d2 above only orders ties
+        dist = haversine_km_vec(origin_rad, _SITE_LATLON_RAD)
+        distance_km = [None if math.isnan(d) else round(d) for d in dist.tolist()]
+    else:
+        d2 = np.full(len(LAUNCH_SITES), np.nan)
+        distance_km = [None] * len(LAUNCH_SITES)
+
+    # sort: by vertical-only first for LEO/TLI, then score desc, then distance asc (unknown last)
+    order = np.lexsort((np.nan_to_num(d2, nan=np.inf), -scores, _NON_VERTICAL))
+    score_list = scores.tolist()
+    return tuple((i, score_list[i], distance_km[i]) for i in order.tolist())
 
 def pick_lunar_sites(limit: int = 3) -> List[Dict[str,Any]]:
     # simple static preference order for MVP
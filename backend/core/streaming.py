@@ -0,0 +1,83 @@
+﻿from __future__ import annotations
+import asyncio
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Tuple
+
+import orjson
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Flush window for batched_stream: whichever limit is hit first.
+BATCH_MAX_CHUNKS = 16
+BATCH_MAX_INTERVAL_S = 0.05
+
+async def batched_stream(
+    src: AsyncIterator[str],
+    max_chunks: int = BATCH_MAX_CHUNKS,
+    max_interval: float = BATCH_MAX_INTERVAL_S,
+) -> AsyncIterator[str]:
+    """
+    Coalesce token deltas into larger chunks so the HTTP layer handles one event
+    per window instead of one per token. A chunk is flushed after `max_chunks`
+    deltas or `max_interval` seconds after the first buffered delta.
+    """
+    loop = asyncio.get_running_loop()
+    it = src.__aiter__()
+    buf: List[str] = []
+    deadline = 0.0
+    # Keep one pending __anext__ across flushes; cancelling it would close the source generator.
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(it.__anext__())
+            timeout = max(0.0, deadline - loop.time()) if buf else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield "".join(buf)
+                buf.clear()
+                continue
+
+            task, pending = pending, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                break
+            if not buf:
+                deadline = loop.time() + max_interval
+            buf.append(chunk)
+            if len(buf) >= max_chunks:
+                yield "".join(buf)
+                buf.clear()
+        if buf:
+            yield "".join(buf)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+def sse_event(event: str, data: Any) -> str:
+    """One named SSE event with a JSON payload."""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+async def sse_events(
+    chunks: AsyncIterator[str],
+    head: Iterable[Tuple[str, Any]] = (),
+    tail: Optional[Callable[[], Iterable[Tuple[str, Any]]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Frame text deltas as Server-Sent Events: one `data: "<json string>"` per chunk,
+    then `data: [DONE]`. Errors mid-stream are sent as an `error` event.
+    `head` holds (event, payload) pairs sent as named events before the first delta;
+    `tail()` is called once the deltas are exhausted and its pairs are sent before [DONE].
+    """
+    for event, data in head:
+        yield sse_event(event, data)
+    try:
+        async for chunk in chunks:
+            yield f"data: {orjson.dumps(chunk).decode()}\n\n"
+    except Exception as e:
+        yield sse_event("error", str(e))
+        return
+    if tail is not None:
+        for event, data in tail():
+            yield sse_event(event, data)
+    yield "data: [DONE]\n\n"
@@ -1,10 +1,11 @@
 ﻿from __future__ import annotations
 import io
 import math
+from functools import lru_cache
+from typing import List, Sequence, Tuple
 
-import matplotlib
-matplotlib.use("Agg")  # headless
-import matplotlib.pyplot as plt
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
 
 from backend.core.parametric_specs import MissionPlan, RocketSpecDraft, MissionTarget
 
@@ -12,11 +13,86 @@ EARTH_RADIUS_KM = 6371.0
 LEO_ALT_KM = 200.0
 MOON_DIST_KM = 384400.0
 
-def _circle(ax, r, **kw):
-    th = [i * math.pi / 180 for i in range(0, 361)]
-    x = [r * math.cos(t) for t in th]
-    y = [r * math.sin(t) for t in th]
-    ax.plot(x, y, **kw)
+# Canvas: square image showing [-VIEW, VIEW] Earth radii on both axes
+CANVAS_PX = 960
+VIEW = 6.2
+_SCALE = CANVAS_PX / (2 * VIEW)
+
+_INK = (0, 0, 0)
+_ASCENT = (31, 119, 180)
+_TLI = (255, 127, 14)
+_MUTED = (85, 85, 85)
+
+# Normalize radii so Earth ~= 1.0
+R_E = 1.0
+R_LEO = (EARTH_RADIUS_KM + LEO_ALT_KM) / EARTH_RADIUS_KM  # ~1.031
+R_APOGEE = MOON_DIST_KM / EARTH_RADIUS_KM                # ~60.3 Re
+R_APOGEE_VIS = min(R_APOGEE, 5.5)                         # clamped to keep the figure reasonable
+
+def _to_px(x: np.ndarray, y: np.ndarray) -> List[Tuple[float, float]]:
+    """World (Earth radii, y up) -> pixel (y down) vertices for ImageDraw."""
+    return list(zip(((x + VIEW) * _SCALE).tolist(), ((VIEW - y) * _SCALE).tolist()))
+
+def _dashed(pts: Sequence[Tuple[float, float]], dash: int = 6) -> List[List[Tuple[float, float]]]:
+    """Split a polyline into every-other run of `dash` segments."""
+    return [list(pts[i:i + dash + 1]) for i in range(0, len(pts) - 1, 2 * dash)]
+
+# Geometry that never changes, built once
+_THETA = np.linspace(0.0, 2 * np.pi, 361)
+_EARTH = _to_px(R_E * np.cos(_THETA), R_E * np.sin(_THETA))
+_LEO_DASHES = _dashed(_to_px(R_LEO * np.cos(_THETA), R_LEO * np.sin(_THETA)))
+_TH_ASCENT = np.radians(np.arange(80, 100))
+_ASCENT_ARC = _to_px(R_E * np.cos(_TH_ASCENT), R_E * np.sin(_TH_ASCENT))
+# TLI ellipse with perigee at R_LEO, Earth at the focus (approx visual)
+_TLI_A = (R_LEO + R_APOGEE_VIS) / 2.0
+_TLI_C = _TLI_A - R_LEO
+_TLI_B = math.sqrt(max(_TLI_A * _TLI_A - _TLI_C * _TLI_C, 1e-6))
+_TH_TLI = np.radians(np.arange(0, 180))
+_TLI_ARC = _to_px(_TLI_A * np.cos(_TH_TLI) - _TLI_C, _TLI_B * np.sin(_TH_TLI))
+
+# Font sizes (px); fonts are loaded on first render, not at import
+_SIZE_TITLE = 26
+_SIZE_LABEL = 20
+_SIZE_SMALL = 18
+
+@lru_cache(maxsize=None)
+def _font(size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.load_default(size=size)
+
+def _text(draw: ImageDraw.ImageDraw, x: float, y: float, s: str, size: int, ha: str = "left", va: str = "baseline", fill=_INK) -> None:
+    """Place text at world (x, y) with matplotlib-like ha/va alignment."""
+    px, py = (x + VIEW) * _SCALE, (VIEW - y) * _SCALE
+    font = _font(size)
+    left, top, right, bottom = draw.textbbox((0, 0), s, font=font)
+    w, h = right - left, bottom - top
+    px -= {"left": 0, "center": w / 2, "right": w}[ha] + left
+    py -= {"top": 0, "center": h / 2, "bottom": h, "baseline": h}[va] + top
+    draw.text((px, py), s, font=font, fill=fill)
+
+@lru_cache(maxsize=1)
+def _base() -> Image.Image:
+    """Everything that doesn't depend on the mission: title, Earth, LEO ring, ascent arc, footer."""
+    img = Image.new("RGB", (CANVAS_PX, CANVAS_PX), "white")
+    draw = ImageDraw.Draw(img)
+
+    title = "Ascent & Transfer (not to scale)"
+    title_font = _font(_SIZE_TITLE)
+    draw.text(((CANVAS_PX - draw.textlength(title, font=title_font)) / 2, 12), title, font=title_font, fill=_INK)
+
+    # Earth
+    draw.line(_EARTH, fill=_INK, width=2)
+    _text(draw, 0, -R_E - 0.1, "Earth", _SIZE_LABEL, ha="center", va="top")
+
+    # LEO ring
+    for dash in _LEO_DASHES:
+        draw.line(dash, fill=_INK, width=2)
+    _text(draw, R_LEO + 0.05, 0, "LEO (~200 km)", _SIZE_SMALL, va="center")
+
+    # Ascent arc (small portion from Earth to LEO)
+    draw.line(_ASCENT_ARC, fill=_ASCENT, width=4)
+
+    _text(draw, 0, -6.0, "Diagram is illustrative; not to scale.", _SIZE_SMALL, ha="center", fill=_MUTED)
+    return img
 
 def make_trajectory_png(plan: MissionPlan, spec: RocketSpecDraft) -> bytes:
     """
@@ -24,54 +100,21 @@ def make_trajectory_png(plan: MissionPlan, spec: RocketSpecDraft) -> bytes:
       - Earth (circle)
       - LEO (small ring)
       - If TLI: an elliptical arc with perigee near LEO and 'clamped' apogee
+    Only plan.target affects the picture, so the PNG bytes are cached per target.
     """
-    # Normalize radii so Earth ~= 1.0
-    r_e = 1.0
-    r_leo = (EARTH_RADIUS_KM + LEO_ALT_KM) / EARTH_RADIUS_KM  # ~1.031
-    r_apogee = MOON_DIST_KM / EARTH_RADIUS_KM                 # ~60.3 Re
-    # Clamp for visualization (keep figure reasonable)
-    r_apogee_vis = min(r_apogee, 5.5)
+    return _render_cached(MissionTarget(plan.target).value)
 
-    fig, ax = plt.subplots(figsize=(6, 6))
-    ax.set_aspect("equal")
-    ax.set_title("Ascent & Transfer (not to scale)")
+@lru_cache(maxsize=16)
+def _render_cached(target: str) -> bytes:
+    img = _base().copy()  # static layer is rendered once, on first use
+    draw = ImageDraw.Draw(img)
 
-    # Earth
-    _circle(ax, r_e, color="black")
-    ax.fill([0], [0], "white")
-    ax.text(0, -r_e - 0.1, "Earth", ha="center", va="top", fontsize=9)
-
-    # LEO ring
-    _circle(ax, r_leo, color="black", linestyle="--")
-    ax.text(r_leo + 0.05, 0, "LEO (~200 km)", fontsize=8, va="center")
-
-    # Ascent arc (small portion from Earth to LEO)
-    th_ascent = [i * math.pi / 180 for i in range(80, 100)]
-    ax.plot([r_e * math.cos(t) for t in th_ascent],
-            [r_e * math.sin(t) for t in th_ascent],
-            linewidth=2)
-
-    if plan.target == MissionTarget.TLI:
-        # Simple ellipse with perigee at r_leo; apogee clamped
-        a = (r_leo + r_apogee_vis) / 2.0
-        c = a - r_leo  # focus at Earth center
-        b = math.sqrt(max(a*a - c*c, 1e-6))
-        # Parametric ellipse around Earth focus at (0,0) (approx visual)
-        th = [i * math.pi / 180 for i in range(0, 180)]
-        x = [a * math.cos(t) - c for t in th]
-        y = [b * math.sin(t) for t in th]
-        ax.plot(x, y, linewidth=2)
-        ax.text(-a, 0.1, "TLI ellipse (clamped)", fontsize=8, va="bottom")
+    if target == MissionTarget.TLI.value:
+        draw.line(_TLI_ARC, fill=_TLI, width=4)
+        _text(draw, -_TLI_A, 0.1, "TLI ellipse (clamped)", _SIZE_SMALL, va="bottom")
     else:
-        ax.text(0, r_leo + 0.2, "LEO mission", fontsize=9, ha="center")
-
-    # Cosmetics
-    ax.set_xlim(-6.2, 6.2)
-    ax.set_ylim(-6.2, 6.2)
-    ax.axis("off")
-    ax.text(0, -6.0, "Diagram is illustrative; not to scale.", fontsize=8, ha="center", color="#555")
-
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight", dpi=160)
-    plt.close(fig)
-    return buf.getvalue()
+        _text(draw, 0, R_LEO + 0.2, "LEO mission", _SIZE_LABEL, ha="center")
+
+    with io.BytesIO() as buf:
+        img.save(buf, format="PNG", optimize=False, compress_level=1)
+        return buf.getvalue()  # the one copy the lru_cache keeps; BytesIO is freed on exit
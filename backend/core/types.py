@@ -1,21 +1,50 @@
 ﻿from __future__ import annotations
+from functools import cached_property
 from typing import Any, Dict, List, Literal, Optional
-from pydantic import BaseModel, Field
+import msgspec
+import orjson
 
 Role = Literal["system", "user", "assistant"]
 
-class Message(BaseModel):
+# Hot-path DTOs are msgspec Structs (like the KB records): construction does no
+# per-field validation. Request bodies are still validated by the API models.
+
+class Message(msgspec.Struct, frozen=True, dict=True):
     role: Role
     content: str
 
-class LLMRequest(BaseModel):
+    @cached_property
+    def as_dict(self) -> Dict[str, str]:
+        """Provider-ready dict; computed once per (immutable) message."""
+        return {"role": self.role, "content": self.content}
+
+class LLMRequest(msgspec.Struct, kw_only=True, dict=True):
     messages: List[Message]
     temperature: float = 0.2
     max_tokens: Optional[int] = None
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    metadata: Dict[str, Any] = {}
+
+    def canonical_json(self) -> str:
+        """
+        Compact, key-sorted JSON of (messages, temperature, max_tokens) for cache keys.
+        Memoized until any of those inputs change (messages are frozen, so identity is enough).
+        """
+        sig = (self.temperature, self.max_tokens, tuple(id(m) for m in self.messages))
+        cached = self.__dict__.get("_canonical")
+        if cached is None or cached[0] != sig:
+            blob = orjson.dumps(
+                {
+                    "messages": [m.as_dict for m in self.messages],
+                    "temperature": self.temperature,
+                    "max_tokens": self.max_tokens,
+                },
+                option=orjson.OPT_SORT_KEYS,
+            ).decode()
+            cached = self.__dict__["_canonical"] = (sig, blob)
+        return cached[1]
 
-class LLMResponse(BaseModel):
+class LLMResponse(msgspec.Struct, kw_only=True):
     text: str
-    usage: Dict[str, int] = Field(default_factory=dict)
+    usage: Dict[str, int] = {}
     model_name: Optional[str] = None
     finish_reason: Optional[str] = None
@@ -0,0 +1,353 @@
+﻿from __future__ import annotations
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+import orjson
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from selectolax.parser import HTMLParser
+    _HAS_SELECTOLAX = True
+except Exception:
+    HTMLParser = None  # type: ignore[assignment]
+    _HAS_SELECTOLAX = False
+
+# ---------------- Config ----------------
+PROVIDER = os.getenv("AERO_SEARCH_PROVIDER", "bing").lower()   # "bing" | "serpapi" | "none"
+BING_KEY = os.getenv("AERO_BING_KEY", "")
+SERP_KEY = os.getenv("SERPAPI_KEY", "")
+MAX_RESULTS = int(os.getenv("AERO_WEB_MAX_RESULTS", "12"))
+MKT = os.getenv("AERO_WEB_MKT", "en-US")
+
+# Prefer authoritative domains; set empty to disable filtering.
+DEFAULT_ALLOW = [
+    "faa.gov", "nasa.gov", "esa.int", "jaxa.jp", "dlr.de", "spaceforce.mil",
+    "boeing.com", "spacex.com", "rocketlabusa.com"
+]
+ALLOWLIST = [d.strip().lower() for d in os.getenv(
+    "AERO_WEB_DOMAINS_ALLOW", ",".join(DEFAULT_ALLOW)
+).split(",") if d.strip()]
+
+CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "cache", "web"))
+os.makedirs(CACHE_DIR, exist_ok=True)
+CACHE_TTL_S = int(os.getenv("AERO_WEB_CACHE_TTL_S", "86400"))  # 1 day
+MEM_CACHE_MAX = int(os.getenv("AERO_WEB_MEM_CACHE_MAX", "512"))
+
+# In-memory tier in front of the disk cache: key -> (ts, orjson payload), LRU order
+_MEM: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+_MEM_LOCK = threading.Lock()
+
+UA = {"User-Agent": "AeroAI/1.0 (+https://example.com)"}
+FETCH_WORKERS = int(os.getenv("AERO_WEB_FETCH_WORKERS", "8"))
+# Page bodies are read up to this many bytes; only the first ~800 visible chars are kept anyway
+FETCH_MAX_BYTES = int(os.getenv("AERO_WEB_FETCH_MAX_BYTES", str(512 * 1024)))
+
+# One keep-alive pool for search APIs and page fetches (shared by the worker threads);
+# transient 429/5xx responses are retried with a short backoff
+_SESSION = requests.Session()
+_SESSION.headers.update(UA)
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504]),
+)
+_SESSION.mount("https://", _HTTP_ADAPTER)
+_SESSION.mount("http://", _HTTP_ADAPTER)
+
+# ---------------- Cache helpers ----------------
+@lru_cache(maxsize=1024)
+def _cache_path(key: str) -> str:
+    # Keys repeat within a session (same queries); hash each one once
+    h = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{h}.json")
+
+def _mem_get(key: str) -> Optional[Tuple[float, bytes]]:
+    with _MEM_LOCK:
+        hit = _MEM.get(key)
+        if hit is not None:
+            _MEM.move_to_end(key)
+        return hit
+
+def _mem_put(key: str, ts: float, blob: bytes) -> None:
+    with _MEM_LOCK:
+        _MEM[key] = (ts, blob)
+        _MEM.move_to_end(key)
+        while len(_MEM) > MEM_CACHE_MAX:
+            _MEM.popitem(last=False)
+
+def _cache_get(key: str) -> Optional[dict]:
+    # 1) in-process LRU (payload kept serialized so callers can't mutate cached entries)
+    hit = _mem_get(key)
+    if hit is not None:
+        ts, blob = hit
+        if time.time() - ts <= CACHE_TTL_S:
+            return orjson.loads(blob)
+        with _MEM_LOCK:
+            _MEM.pop(key, None)
+        return None
+
+    # 2) disk
+    p = _cache_path(key)
+    if not os.path.exists(p):
+        return None
+    try:
+        with open(p, "rb") as f:
+            data = orjson.loads(f.read())
+        ts = data.get("_ts", 0)
+        if time.time() - ts > CACHE_TTL_S:
+            return None
+        payload = data.get("payload")
+        _mem_put(key, ts, orjson.dumps(payload))
+        return payload
+    except Exception:
+        return None
+
+def _cache_set(key: str, payload: dict) -> None:
+    ts = time.time()
+    _mem_put(key, ts, orjson.dumps(payload))
+    p = _cache_path(key)
+    try:
+        with open(p, "wb") as f:
+            f.write(orjson.dumps({"_ts": ts, "payload": payload}))
+    except Exception:
+        pass
+
+# ---------------- Fetch + extract ----------------
+def _decode(body: bytes, encoding: Optional[str]) -> Optional[str]:
+    try:
+        text = body.decode(encoding or "utf-8", errors="replace")
+    except LookupError:  # unknown charset label
+        text = body.decode("utf-8", errors="replace")
+    return text or None
+
+def _fetch(url: str, timeout: int = 10) -> Optional[str]:
+    """Streamed GET: a single bounded read instead of buffering the whole page."""
+    try:
+        with _SESSION.get(url, timeout=timeout, stream=True) as r:
+            if r.status_code != 200:
+                return None
+            return _decode(r.raw.read(FETCH_MAX_BYTES, decode_content=True), r.encoding)
+    except Exception:
+        return None
+
+async def _fetch_async(url: str, client: httpx.AsyncClient, timeout: int = 10) -> Optional[str]:
+    try:
+        async with client.stream("GET", url, headers=UA, timeout=timeout, follow_redirects=True) as r:
+            if r.status_code != 200:
+                return None
+            buf = bytearray()
+            async for chunk in r.aiter_bytes():
+                buf += chunk
+                if len(buf) >= FETCH_MAX_BYTES:
+                    break
+            return _decode(bytes(buf[:FETCH_MAX_BYTES]), r.encoding)
+    except Exception:
+        return None
+
+def _extract_text(html: str, max_chars: int = 1000) -> str:
+    if _HAS_SELECTOLAX:
+        try:
+            # C parser; same visible-text result as the BeautifulSoup path below
+            tree = HTMLParser(html)
+            for node in tree.css("script, style, noscript"):
+                node.decompose()
+            return " ".join((tree.text(separator=" ") or "").split())[:max_chars]
+        except Exception:
+            pass
+    try:
+        soup = BeautifulSoup(html, "html.parser")
+        for tag in soup(["script", "style", "noscript"]):
+            tag.decompose()
+        text = " ".join(soup.get_text(separator=" ").split())
+        return text[:max_chars]
+    except Exception:
+        return html[:max_chars]
+
+def _domain_ok(url: str) -> bool:
+    if not ALLOWLIST:
+        return True
+    try:
+        host = (urlparse(url).netloc or "").lower()
+        return any(host.endswith(d) for d in ALLOWLIST)
+    except Exception:
+        return True
+
+def _dedupe(items: List[dict]) -> List[dict]:
+    seen = set()
+    out = []
+    for it in items:
+        u = it.get("url")
+        if not u or u in seen:
+            continue
+        seen.add(u)
+        out.append(it)
+    return out
+
+# ---------------- Search providers ----------------
+def _search_spec(q: str, count: int) -> Optional[Tuple[str, str, Dict[str, Any], Dict[str, str]]]:
+    """
+    (cache key, url, params, extra headers) for the configured provider; None if it has no key.
+    Shared by the sync and async search paths.
+    """
+    if PROVIDER == "serpapi":
+        if not SERP_KEY:
+            return None
+        params = {"engine": "google", "q": q, "num": min(count, 10), "api_key": SERP_KEY}
+        return f"serpapi::{q}::{count}", "https://serpapi.com/search.json", params, {}
+    if not BING_KEY:
+        return None
+    params = {"q": q, "count": count, "mkt": MKT, "responseFilter": "Webpages"}
+    return (
+        f"bing::{q}::{count}::{MKT}", "https://api.bing.microsoft.com/v7.0/search",
+        params, {"Ocp-Apim-Subscription-Key": BING_KEY},
+    )
+
+def _search_items(data: dict) -> List[dict]:
+    if PROVIDER == "serpapi":
+        return [
+            {"title": v.get("title"), "url": v.get("link"), "snippet": v.get("snippet")}
+            for v in data.get("organic_results", [])
+        ]
+    return [
+        {"title": v.get("name"), "url": v.get("url"), "snippet": v.get("snippet")}
+        for v in (data.get("webPages") or {}).get("value", [])
+    ]
+
+def _search(q: str, count: int) -> List[dict]:
+    spec = _search_spec(q, count)
+    if spec is None:
+        return []
+    key, url, params, headers = spec
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    try:
+        r = _SESSION.get(url, params=params, headers=headers, timeout=10)
+        r.raise_for_status()
+        items = _search_items(r.json())
+        _cache_set(key, items)
+        return items
+    except Exception:
+        return []
+
+async def _search_async(q: str, count: int, client: httpx.AsyncClient) -> List[dict]:
+    spec = _search_spec(q, count)
+    if spec is None:
+        return []
+    key, url, params, headers = spec
+    # The cache falls through to disk; keep that I/O off the event loop
+    cached = await asyncio.to_thread(_cache_get, key)
+    if cached is not None:
+        return cached
+    try:
+        r = await client.get(url, params=params, headers={**UA, **headers}, timeout=10)
+        r.raise_for_status()
+        items = _search_items(orjson.loads(r.content))
+        await asyncio.to_thread(_cache_set, key, items)
+        return items
+    except Exception:
+        return []
+
+def _rank_hits(items: List[dict]) -> List[dict]:
+    # allowlisted domains first; one pass instead of an O(n^2) "not in allow" scan
+    allow: List[dict] = []
+    other: List[dict] = []
+    for x in items:
+        (allow if x.get("url") and _domain_ok(x["url"]) else other).append(x)
+    return _dedupe(allow + other)
+
+def search_web(q: str, count: int = 6) -> List[dict]:
+    if PROVIDER == "none":
+        return []
+    return _rank_hits(_search(q, count))
+
+async def search_web_async(q: str, client: httpx.AsyncClient, count: int = 6) -> List[dict]:
+    if PROVIDER == "none":
+        return []
+    return _rank_hits(await _search_async(q, count, client))
+
+# ---------------- Query planning + collection ----------------
+@lru_cache(maxsize=256)
+def _queries(origin_hint: Optional[str], target: Optional[str]) -> Tuple[str, ...]:
+    q = [
+        "site:faa.gov spaceports",
+        "site:faa.gov licensed commercial spaceports list",
+        "site:nasa.gov Artemis landing regions",
+        "site:nasa.gov lunar south pole landing sites overview"
+    ]
+    if origin_hint:
+        q.append(f"nearest orbital launch site to {origin_hint}")
+        q.append(f"spaceport near {origin_hint}")
+    if target:
+        q.append(f"best US launch sites for {target} mission")
+    return tuple(q)
+
+def _fetch_plan(queries: Tuple[str, ...], hits_per_q: List[List[dict]], max_total: int) -> List[Tuple[str, dict]]:
+    """(query, hit) pairs in query/hit order, one per URL, capped for fetching."""
+    seen = set()
+    pairs = []
+    for q, hits in zip(queries, hits_per_q):
+        for h in hits:
+            url = h.get("url")
+            if not url or url in seen:
+                continue
+            seen.add(url)
+            pairs.append((q, h))
+    # Over-fetch a little since some pages fail or come back empty
+    return pairs[:max_total * 2]
+
+def _snippets(pairs: List[Tuple[str, dict]], pages: List[Optional[str]], max_total: int) -> List[Dict[str, str]]:
+    out: List[Dict[str, str]] = []
+    for (q, h), html in zip(pairs, pages):
+        if not html:
+            continue
+        out.append({
+            "title": h.get("title") or "Untitled",
+            "url": h["url"],
+            "query": q,
+            "excerpt": _extract_text(html, max_chars=800)
+        })
+        if len(out) >= max_total:
+            break
+    return out
+
+def collect_web_snippets(origin_hint: Optional[str], target: Optional[str], max_total: int = MAX_RESULTS) -> List[Dict[str, str]]:
+    queries = _queries(origin_hint, target)
+    count = max(4, min(8, max_total))
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as ex:
+        # all searches at once, then all page fetches at once
+        hits_per_q = list(ex.map(lambda q: search_web(q, count=count), queries))
+        pairs = _fetch_plan(queries, hits_per_q, max_total)
+        pages = list(ex.map(lambda p: _fetch(p[1]["url"]), pairs))
+    return _snippets(pairs, pages, max_total)
+
+async def collect_web_snippets_async(
+    origin_hint: Optional[str],
+    target: Optional[str],
+    client: httpx.AsyncClient,
+    max_total: int = MAX_RESULTS,
+) -> List[Dict[str, str]]:
+    """
+    Same result as collect_web_snippets(), for callers already on an event loop:
+    searches and page fetches each go out as one asyncio.gather on the caller's client
+    (in the API, the lifespan-owned app.state.http), so nothing here outlives its loop.
+    """
+    queries = _queries(origin_hint, target)
+    count = max(4, min(8, max_total))
+    hits_per_q = await asyncio.gather(*(search_web_async(q, client, count) for q in queries))
+    pairs = _fetch_plan(queries, list(hits_per_q), max_total)
+    pages = await asyncio.gather(*(_fetch_async(h["url"], client) for _, h in pairs))
+    # HTML parsing is CPU-bound; keep it off the event loop
+    return await asyncio.to_thread(_snippets, pairs, list(pages), max_total)
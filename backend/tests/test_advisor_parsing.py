@@ -0,0 +1,21 @@
+﻿# backend/tests/test_advisor_parsing.py
+import orjson
+
+from backend.api.routes.advisor_routes import _extract_json_span
+
+
+def test_returns_none_without_an_object():
+    assert _extract_json_span("no json here") is None
+    assert _extract_json_span('{"unterminated": [1, 2') is None
+
+
+def test_extracts_the_first_balanced_object_from_prose():
+    text = 'Sure! Here you go:\n{"answer_md": "ok", "actions": [{"type": "a"}]}\nAnything else? {"x": 1}'
+    span = _extract_json_span(text)
+    assert orjson.loads(span) == {"answer_md": "ok", "actions": [{"type": "a"}]}
+
+
+def test_ignores_braces_and_escaped_quotes_inside_strings():
+    obj = {"answer_md": 'use {braces} and "quotes" \\ with a trailing backslash\\', "n": {"k": "}"}}
+    text = "prefix " + orjson.dumps(obj).decode() + " suffix }"
+    assert orjson.loads(_extract_json_span(text)) == obj
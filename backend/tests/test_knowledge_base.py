@@ -0,0 +1,56 @@
+﻿# backend/tests/test_knowledge_base.py
+from typing import List
+
+import orjson
+import pytest
+
+from backend.core.knowledge_base import KnowledgeBase, RocketSpec
+
+ROCKETS = [
+    {"id": "falcon9", "name": "Falcon 9", "manufacturer": "SpaceX", "propellants": ["RP-1", "LOX"],
+     "notes": "Reusable first stage; workhorse medium-lift"},
+    {"id": "falcon-heavy", "name": "Falcon Heavy", "manufacturer": "SpaceX", "propellants": ["RP-1", "LOX"],
+     "notes": "Three Falcon 9 cores; heavy-lift"},
+    {"id": "electron", "name": "Electron", "manufacturer": "Rocket Lab", "propellants": ["RP-1", "LOX"],
+     "notes": "Small-lift, electric pump-fed Rutherford engines"},
+    {"id": "ariane6", "name": "Ariane 6", "manufacturer": "ArianeGroup", "propellants": ["LH2", "LOX"],
+     "notes": "European heavy-lift successor to Ariane 5"},
+    {"id": "pslv", "name": "PSLV", "manufacturer": "ISRO", "propellants": ["Solid", "UDMH/N2O4"]},
+]
+
+
+def _baseline_search(records: List[RocketSpec], q: str, limit: int) -> List[str]:
+    """The pre-index full scan: phrase hits plus per-token substring hits over every record."""
+    ql = q.lower().strip()
+    if not ql:
+        return []
+    scored = []
+    for r in records:
+        hay = " ".join([
+            r.id or "", r.name or "", r.manufacturer or "", " ".join(r.propellants or []), r.notes or ""
+        ]).lower()
+        score = hay.count(ql) + sum(hay.count(t) for t in ql.split())
+        if score > 0:
+            scored.append((score, r))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [r.id for _, r in scored[:limit]]
+
+
+@pytest.fixture
+def kb(tmp_path):
+    path = tmp_path / "rockets.json"
+    path.write_bytes(orjson.dumps(ROCKETS))
+    return KnowledgeBase(data_path=path)
+
+
+@pytest.mark.parametrize("q", [
+    "falcon", "Falcon 9", "spacex heavy", "lox", "rp-1", "lift", "heavy-lift", "ift", "a", "9",
+    "rocket lab", "udmh/n2o4", "ariane 5", "  ELECTRON  ", "no-such-rocket", "",
+])
+def test_search_matches_the_baseline_scan(kb, q):
+    assert [r.id for r in kb.search(q, limit=10)] == _baseline_search(kb.all(), q, limit=10)
+
+
+def test_search_respects_limit(kb):
+    assert [r.id for r in kb.search("lox", limit=2)] == _baseline_search(kb.all(), "lox", limit=2)
+    assert len(kb.search("lox", limit=2)) == 2
@@ -0,0 +1,53 @@
+﻿# backend/tests/test_llm_cache.py
+from backend.core.llm_cache import ExactPromptCache
+from backend.core.types import LLMRequest, LLMResponse, Message
+
+
+def _req(question: str = "Say 'ok'.", temperature: float = 0.2) -> LLMRequest:
+    return LLMRequest(
+        messages=[
+            Message(role="system", content="You are terse."),
+            Message(role="user", content=question),
+        ],
+        temperature=temperature,
+    )
+
+
+def test_key_is_stable_for_equal_requests():
+    assert ExactPromptCache.key("openai:gpt-4o-mini", _req()) == ExactPromptCache.key("openai:gpt-4o-mini", _req())
+
+
+def test_key_changes_with_model_messages_and_temperature():
+    base = ExactPromptCache.key("openai:gpt-4o-mini", _req())
+    assert ExactPromptCache.key("claude:haiku", _req()) != base
+    assert ExactPromptCache.key("openai:gpt-4o-mini", _req("Say 'no'.")) != base
+    assert ExactPromptCache.key("openai:gpt-4o-mini", _req(temperature=0.0)) != base
+
+
+def test_key_follows_in_place_temperature_change():
+    req = _req()
+    before = ExactPromptCache.key("m", req)
+    req.temperature = 0.0  # Orchestrator overrides temperature on the request it was given
+    assert ExactPromptCache.key("m", req) == ExactPromptCache.key("m", _req(temperature=0.0)) != before
+
+
+def test_get_returns_an_equal_copy():
+    cache = ExactPromptCache()
+    resp = LLMResponse(text="ok", model_name="gpt-4o-mini", usage={"total_tokens": 3})
+    cache.put("m", _req(), resp)
+    hit = cache.get("m", _req())
+    assert hit == resp and hit is not resp
+    hit.usage["total_tokens"] = 99
+    assert cache.get("m", _req()).usage == {"total_tokens": 3}
+
+
+def test_expired_and_evicted_entries_miss(monkeypatch):
+    cache = ExactPromptCache(ttl_s=10, max_entries=2)
+    now = [1000.0]
+    monkeypatch.setattr("backend.core.llm_cache.time.time", lambda: now[0])
+    for q in ("a", "b", "c"):
+        cache.put("m", _req(q), LLMResponse(text=q, model_name="m"))
+    assert cache.get("m", _req("a")) is None  # least recently used, evicted
+    assert cache.get("m", _req("c")).text == "c"
+    now[0] += 11
+    assert cache.get("m", _req("c")) is None
@@ -0,0 +1,71 @@
+﻿# backend/tests/test_middleware.py
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.api.middleware import MAX_INFLATED_BYTES, GzipRequestMiddleware
+
+
+def _client(**kwargs) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(GzipRequestMiddleware, **kwargs)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        body = await request.body()
+        return {
+            "size": len(body),
+            "head": body[:64].decode("latin-1"),
+            "content_length": request.headers.get("content-length"),
+            "content_encoding": request.headers.get("content-encoding"),
+        }
+
+    return TestClient(app)
+
+
+def _post_gzip(client, payload: bytes):
+    return client.post("/echo", content=gzip.compress(payload),
+                       headers={"Content-Encoding": "gzip", "Content-Type": "application/json"})
+
+
+def test_gzip_body_is_inflated_and_headers_rewritten():
+    payload = b'{"sketch": "' + b"x" * 10_000 + b'"}'
+    r = _post_gzip(_client(), payload)
+    assert r.status_code == 200
+    assert r.json() == {
+        "size": len(payload),
+        "head": payload[:64].decode(),
+        "content_length": str(len(payload)),
+        "content_encoding": None,
+    }
+
+
+def test_plain_body_passes_through():
+    r = _client().post("/echo", content=b'{"a": 1}')
+    assert r.status_code == 200
+    assert r.json()["size"] == 8
+    assert r.json()["content_length"] == "8"
+
+
+def test_body_at_the_cap_is_accepted():
+    r = _post_gzip(_client(max_size=1024), b"a" * 1024)
+    assert r.status_code == 200
+    assert r.json()["size"] == 1024
+
+
+@pytest.mark.parametrize("max_size, size", [(1024, 1025), (MAX_INFLATED_BYTES, MAX_INFLATED_BYTES + 1)])
+def test_oversized_inflated_body_is_rejected(max_size, size):
+    kwargs = {} if max_size == MAX_INFLATED_BYTES else {"max_size": max_size}
+    r = _post_gzip(_client(**kwargs), b"\0" * size)
+    assert r.status_code == 413
+    assert r.json() == {"detail": "Decompressed request body too large"}
+
+
+@pytest.mark.parametrize("body", [b"not gzip at all", gzip.compress(b'{"a": 1}' * 100)[:-12]],
+                         ids=["not-gzip", "truncated"])
+def test_invalid_or_truncated_gzip_is_rejected(body):
+    r = _client().post("/echo", content=body, headers={"Content-Encoding": "gzip"})
+    assert r.status_code == 400
+    assert r.json() == {"detail": "Invalid gzip request body"}
@@ -1,14 +1,40 @@
 ﻿# backend/tests/test_orch.py
+import asyncio
 import os, pytest
-from backend.core.orchestrator import build_orchestrator
+from backend.core.orchestrator import Orchestrator, get_orchestrator
 from backend.core.types import Message, LLMRequest
 
 @pytest.mark.skipif(not os.getenv("OPENAI_API_KEY"), reason="No API key")
 def test_basic_chat():
-    orch = build_orchestrator()
+    orch = get_orchestrator()
     req = LLMRequest(messages=[
         Message(role="system", content="You are terse."),
         Message(role="user", content="Say 'ok'.")
     ], max_tokens=10)
-    resp = orch.send_query(req)
+    resp = asyncio.run(orch.generate(req))
     assert isinstance(resp.text, str) and len(resp.text) > 0
+
+
+class _StubAdapter:
+    def __init__(self, model, fail=False):
+        self.model, self.fail = model, fail
+
+    async def health(self):
+        await asyncio.sleep(0.05)
+        if self.fail:
+            raise RuntimeError("unreachable")
+        return {"status": "ok", "model": self.model}
+
+def test_health_reports_built_adapters_only():
+    orch = Orchestrator(default_provider="openai", default_model="gpt-4o-mini")
+    assert asyncio.run(orch.health()) == {}
+
+    orch._adapters[("openai", "gpt-4o-mini")] = _StubAdapter("gpt-4o-mini")
+    orch._adapters[("claude", "claude-x")] = _StubAdapter("claude-x", fail=True)
+    health = asyncio.run(orch.health())
+    assert health == {
+        "openai": {"gpt-4o-mini": {"status": "ok", "model": "gpt-4o-mini"}},
+        "claude": {"claude-x": {"status": "error", "detail": "unreachable"}},
+    }
+    # Checking health never builds (or caches) an adapter under the wrong model
+    assert set(orch._adapters) == {("openai", "gpt-4o-mini"), ("claude", "claude-x")}
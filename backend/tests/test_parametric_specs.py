@@ -0,0 +1,42 @@
+﻿# backend/tests/test_parametric_specs.py
+import pytest
+
+from backend.core.parametric_specs import (
+    EstimateOverrides, RocketSpecDraft, SketchMeta, StageEstimate, estimate_specs,
+)
+
+TWO_BOXES = SketchMeta(objects=2, bounding_boxes=[
+    {"left": 120, "top": 60, "width": 90, "height": 240},
+    {"left": 120, "top": 300, "width": 90, "height": 156},
+])
+
+
+@pytest.mark.parametrize("overrides", [
+    None,
+    EstimateOverrides(force_stages=3, min_diameter_m=5, target_payload_leo_kg=250),
+    EstimateOverrides(force_stages=1, preferred_upper_propellant="Solid"),
+])
+def test_constructed_spec_equals_a_validated_one(overrides):
+    spec = estimate_specs(TWO_BOXES, 0.05, overrides)
+    # model_construct skips validation; the result must still be exactly what validation produces
+    assert RocketSpecDraft.model_validate(spec.model_dump()) == spec
+    assert spec.model_fields_set == set(RocketSpecDraft.model_fields)
+    for stage in spec.stages:
+        assert isinstance(stage, StageEstimate)
+        assert stage.model_fields_set == set(StageEstimate.model_fields)
+
+
+def test_two_box_sketch_estimate():
+    spec = estimate_specs(TWO_BOXES, 0.05)
+    assert [s.stage for s in spec.stages] == [1, 2]
+    assert [s.propellant for s in spec.stages] == ["RP1/LOX", "LH2/LOX"]
+    assert spec.total_height_m == pytest.approx(396 * 0.05)
+    assert spec.max_diameter_m == pytest.approx(90 * 0.05)
+    assert sum(s.length_m for s in spec.stages) == pytest.approx(spec.total_height_m)
+    assert spec.stages[1].diameter_m == pytest.approx(0.6 * spec.max_diameter_m)
+
+
+def test_target_payload_override_sets_liftoff_mass():
+    spec = estimate_specs(TWO_BOXES, 0.05, EstimateOverrides(target_payload_leo_kg=500))
+    assert spec.payload_leo_kg == 500
+    assert spec.liftoff_mass_kg == pytest.approx(500 / 0.0025)
@@ -0,0 +1,48 @@
+﻿# backend/tests/test_report_stream.py
+import json
+import random
+
+import pytest
+
+from frontend.report_stream import ReportMdDecoder
+
+REPORT = 'Line "one"\n\tpath C:\\temp\\ \u00e9t\u00e9 \U0001F680 \\u0041 end\\'
+
+
+def _stream(text, sizes):
+    decoder = ReportMdDecoder()
+    out, i = [], 0
+    for n in sizes:
+        out.append(decoder.feed(text[i:i + n]))
+        i += n
+    out.append(decoder.feed(text[i:]))
+    return out
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunking_matches_full_decode(ensure_ascii, seed):
+    body = json.dumps({"title": "x", "report_md": REPORT, "after": '"report_md": "no"'},
+                      ensure_ascii=ensure_ascii)
+    rng = random.Random(seed)
+    sizes = [rng.randint(1, 6) for _ in range(len(body))]
+    assert "".join(_stream(body, sizes)) == REPORT
+
+
+def test_emits_text_as_it_arrives():
+    body = json.dumps({"report_md": "abc def"})
+    pieces = _stream(body, [1] * len(body))
+    assert [p for p in pieces if p] == list("abc def")
+
+
+def test_escape_split_across_deltas_is_held_back():
+    decoder = ReportMdDecoder()
+    assert decoder.feed('{"report_md": "a\\') == "a"
+    assert decoder.feed("u00") == ""
+    assert decoder.feed('e9b"}') == "\u00e9b"
+    assert decoder.feed('more "text"') == ""
+
+
+def test_no_report_key_yields_nothing():
+    body = json.dumps({"summary": "x" * 500, "notes": ["report_md"]})
+    assert "".join(_stream(body, [7] * 100)) == ""
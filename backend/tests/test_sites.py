@@ -0,0 +1,77 @@
+﻿# backend/tests/test_sites.py
+import math
+from types import MappingProxyType
+
+import numpy as np
+import pytest
+
+from backend.core import sites
+
+SITES = [
+    {"id": "far-pad", "lat_deg": 28.6, "lon_deg": -80.6, "type": "vertical", "faa_licensed": True},
+    {"id": "near-pad", "lat_deg": 28.6, "lon_deg": -90.0, "type": "vertical", "faa_licensed": True},
+    {"id": "runway", "lat_deg": 5.0, "lon_deg": -52.0, "type": "horizontal"},
+    {"id": "polar", "lat_deg": 34.7, "lon_deg": -120.6, "type": "vertical"},
+    {"id": "no-coords", "lat_deg": 28.6, "type": "vertical", "faa_licensed": True},
+    {"id": "tokyo", "lat_deg": 28.6, "lon_deg": 139.7, "type": "vertical", "faa_licensed": True},
+]
+ORIGIN = (29.95, -90.07, "new orleans")
+
+
+@pytest.fixture
+def synthetic_sites(monkeypatch):
+    arrays = sites._site_arrays(SITES)
+    vertical = arrays["vertical"]
+    for name, value in {
+        "LAUNCH_SITES": SITES,
+        "_SITE_BASE": tuple(MappingProxyType(s) for s in SITES),
+        "_SITE_LATLON_RAD": arrays["latlon_rad"],
+        "_VERTICAL": vertical,
+        "_NON_VERTICAL": (vertical == 0).astype(np.int8),
+        "_SITE_SCORE_BASE": 0.6*arrays["low_lat_bonus"] + 0.3*vertical + 0.1*arrays["licensed"],
+    }.items():
+        monkeypatch.setattr(sites, name, value)
+    sites._rank_sites.cache_clear()
+    yield SITES
+    sites._rank_sites.cache_clear()
+
+
+def _baseline_rank(origin, target):
+    """The per-site loop the arrays replaced."""
+    rows = []
+    for s in SITES:
+        dist = None
+        if origin and "lon_deg" in s:
+            dist = round(sites.haversine_km((origin[0], origin[1]), (s["lat_deg"], s["lon_deg"])))
+        rows.append({**s, "score": sites.score_site_for_mission(s, target, None), "distance_km": dist})
+    rows.sort(key=lambda r: (r.get("type") != "vertical", -r["score"],
+                             r["distance_km"] if r["distance_km"] is not None else math.inf))
+    return rows
+
+
+@pytest.mark.parametrize("origin", [ORIGIN, None])
+@pytest.mark.parametrize("target", ["LEO", "TLI"])
+def test_ranking_matches_per_site_loop(synthetic_sites, origin, target):
+    ranked = sites.nearest_and_best_sites(origin, target, None)
+    expected = _baseline_rank(origin, target)
+    assert [r["id"] for r in ranked] == [r["id"] for r in expected]
+    assert [r["distance_km"] for r in ranked] == [r["distance_km"] for r in expected]
+    assert [r["score"] for r in ranked] == pytest.approx([r["score"] for r in expected])
+
+
+def test_vertical_first_then_score_then_distance(synthetic_sites):
+    ids = [r["id"] for r in sites.nearest_and_best_sites(ORIGIN, "LEO", None)]
+    # equal scores: nearest first, unknown distance last; horizontal pads after every vertical one
+    assert ids == ["near-pad", "far-pad", "tokyo", "no-coords", "polar", "runway"]
+
+
+def test_far_site_distance_is_great_circle(synthetic_sites):
+    tokyo = next(r for r in sites.nearest_and_best_sites(ORIGIN, "LEO", None) if r["id"] == "tokyo")
+    assert tokyo["distance_km"] == round(sites.haversine_km(ORIGIN[:2], (28.6, 139.7)))
+
+
+def test_limit_and_results_are_fresh_dicts(synthetic_sites):
+    first = sites.nearest_and_best_sites(ORIGIN, "LEO", None, limit=2)
+    assert [r["id"] for r in first] == ["near-pad", "far-pad"]
+    first[0]["score"] = -1
+    assert sites.nearest_and_best_sites(ORIGIN, "LEO", None, limit=1)[0]["score"] != -1
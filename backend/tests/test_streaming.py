@@ -0,0 +1,97 @@
+﻿# backend/tests/test_streaming.py
+import asyncio
+from typing import AsyncIterator, List
+
+import orjson
+
+from backend.core.streaming import batched_stream, sse_events
+
+
+async def _agen(items: List[str]) -> AsyncIterator[str]:
+    for item in items:
+        yield item
+
+
+async def _failing() -> AsyncIterator[str]:
+    yield "partial"
+    raise RuntimeError("provider went away")
+
+
+async def _paced(items: List[str], delays: List[float]) -> AsyncIterator[str]:
+    for item, delay in zip(items, delays):
+        await asyncio.sleep(delay)
+        yield item
+
+
+def _collect(agen: AsyncIterator[str]) -> List[str]:
+    async def run() -> List[str]:
+        return [x async for x in agen]
+    return asyncio.run(run())
+
+
+def test_sse_events_frames_chunks_as_json_strings():
+    frames = _collect(sse_events(_agen(['{"a": "line\nbreak"}', "tail"])))
+    assert frames == [
+        'data: "{\\"a\\": \\"line\\nbreak\\"}"\n\n',
+        'data: "tail"\n\n',
+        "data: [DONE]\n\n",
+    ]
+    # Each data line is single-line JSON, so newlines in a delta can't break the framing
+    assert orjson.loads(frames[0][6:]) == '{"a": "line\nbreak"}'
+
+
+def test_sse_events_sends_head_and_tail_events_around_the_deltas():
+    frames = _collect(sse_events(
+        _agen(["x"]),
+        head=(("spec", {"stages": 2}),),
+        tail=lambda: (("concept", {"bom": {}}),),
+    ))
+    assert frames == [
+        'event: spec\ndata: {"stages":2}\n\n',
+        'data: "x"\n\n',
+        'event: concept\ndata: {"bom":{}}\n\n',
+        "data: [DONE]\n\n",
+    ]
+
+
+def test_sse_events_reports_errors_and_skips_tail():
+    called = []
+    frames = _collect(sse_events(_failing(), tail=lambda: called.append(True) or ()))
+    assert frames == ['data: "partial"\n\n', 'event: error\ndata: "provider went away"\n\n']
+    assert not called
+
+
+def test_batched_stream_flushes_every_max_chunks():
+    out = _collect(batched_stream(_agen([str(i % 10) for i in range(40)]), max_chunks=16, max_interval=10.0))
+    assert [len(c) for c in out] == [16, 16, 8]
+    assert "".join(out) == "".join(str(i % 10) for i in range(40))
+
+
+def test_batched_stream_flushes_after_max_interval():
+    src = _paced(["a", "b", "c", "d"], [0, 0, 0.2, 0])
+    assert _collect(batched_stream(src, max_chunks=100, max_interval=0.05)) == ["ab", "cd"]
+
+
+def test_batched_stream_empty_source_yields_nothing():
+    assert _collect(batched_stream(_agen([]))) == []
+
+
+def test_batched_stream_close_cancels_the_pending_read():
+    closed = asyncio.Event()
+
+    async def slow() -> AsyncIterator[str]:
+        try:
+            yield "first"
+            await asyncio.sleep(10)
+            yield "never"
+        finally:
+            closed.set()
+
+    async def run() -> List[str]:
+        stream = batched_stream(slow(), max_chunks=100, max_interval=0.01)
+        got = [await stream.__anext__()]
+        await stream.aclose()
+        await asyncio.wait_for(closed.wait(), timeout=1)
+        return got
+
+    assert asyncio.run(run()) == ["first"]
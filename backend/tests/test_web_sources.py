@@ -0,0 +1,65 @@
+﻿# backend/tests/test_web_sources.py
+import asyncio
+
+import httpx
+import pytest
+
+from backend.core import web_sources
+
+PAGES = {
+    "https://www.nasa.gov/a": "<html><script>x()</script><p>Artemis  landing</p></html>",
+    "https://www.faa.gov/b": "<html><style>p{}</style><p>Licensed spaceports</p></html>",
+    "https://blog.example.com/c": "<p>Unranked blog</p>",
+}
+
+
+@pytest.fixture
+def bing(monkeypatch, tmp_path):
+    monkeypatch.setattr(web_sources, "PROVIDER", "bing")
+    monkeypatch.setattr(web_sources, "BING_KEY", "test-key")
+    monkeypatch.setattr(web_sources, "CACHE_DIR", str(tmp_path))
+    web_sources._cache_path.cache_clear()
+    web_sources._MEM.clear()
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if request.url.host == "api.bing.microsoft.com":
+            assert request.headers["Ocp-Apim-Subscription-Key"] == "test-key"
+            value = [{"name": f"Page {u[-1]}", "url": u, "snippet": ""} for u in PAGES]
+            return httpx.Response(200, json={"webPages": {"value": value[::-1]}})
+        html = PAGES.get(str(request.url))
+        return httpx.Response(200, text=html) if html else httpx.Response(404)
+
+    yield calls, httpx.MockTransport(handler)
+    web_sources._cache_path.cache_clear()
+    web_sources._MEM.clear()
+
+
+async def _collect(transport, **kwargs):
+    async with httpx.AsyncClient(transport=transport) as client:
+        return await web_sources.collect_web_snippets_async(None, None, client, **kwargs)
+
+
+def test_collects_allowlisted_snippets_first(bing):
+    calls, transport = bing
+    out = asyncio.run(_collect(transport, max_total=2))
+    assert out == [
+        {"title": "Page b", "url": "https://www.faa.gov/b", "query": "site:faa.gov spaceports",
+         "excerpt": "Licensed spaceports"},
+        {"title": "Page a", "url": "https://www.nasa.gov/a", "query": "site:faa.gov spaceports",
+         "excerpt": "Artemis landing"},
+    ]
+    assert all(r.headers["User-Agent"] == web_sources.UA["User-Agent"] for r in calls)
+
+
+def test_second_event_loop_reuses_cached_searches(bing):
+    calls, transport = bing
+    first = asyncio.run(_collect(transport))
+    searches = sum(r.url.host == "api.bing.microsoft.com" for r in calls)
+    assert searches == len(web_sources._queries(None, None))
+
+    calls.clear()
+    # A fresh loop and client: nothing pooled from the first run is touched
+    assert asyncio.run(_collect(transport)) == first
+    assert not any(r.url.host == "api.bing.microsoft.com" for r in calls)
@@ -0,0 +1,51 @@
+﻿# frontend/report_stream.py
+import re
+
+import orjson
+
+_REPORT_MD_START = re.compile(r'"report_md"\s*:\s*"')
+_STRING_END = re.compile(r'(?<!\\)(?:\\\\)*"')
+_DANGLING_ESCAPE = re.compile(r'(?<!\\)((?:\\\\)*)\\(u[0-9a-fA-F]{0,3})?$')
+
+class ReportMdDecoder:
+    """
+    Incremental decoder for the "report_md" string inside streamed concept JSON.
+    feed() takes each delta and returns only the report text it completes, so every
+    delta is scanned once instead of re-scanning the whole buffer.
+    """
+
+    # Unscanned tail kept while looking for the key, enough to catch '"report_md": "' split across deltas
+    _KEY_LOOKBACK = 64
+
+    def __init__(self) -> None:
+        self._pending = ""  # text before the key, or the undecoded tail of the report string
+        self._in_report = False
+        self._done = False
+
+    def feed(self, delta: str) -> str:
+        if self._done:
+            return ""
+        pending = self._pending + delta
+        if not self._in_report:
+            m = _REPORT_MD_START.search(pending)
+            if not m:
+                self._pending = pending[-self._KEY_LOOKBACK:]
+                return ""
+            self._in_report = True
+            pending = pending[m.end():]
+        # pending starts on an escape boundary, so the first unescaped quote closes the string
+        end = _STRING_END.search(pending)
+        if end:
+            self._done = True
+            raw, self._pending = pending[:end.end() - 1], ""
+        else:
+            # Hold back a dangling escape (a lone backslash or a half-received \uXXXX) until it completes
+            raw = _DANGLING_ESCAPE.sub(r"\1", pending)
+            self._pending = pending[len(raw):]
+        try:
+            return orjson.loads(f'"{raw}"')
+        except ValueError:
+            # e.g. a surrogate pair split across deltas: retry once the next delta arrives
+            if not self._done:
+                self._pending = raw + self._pending
+            return ""
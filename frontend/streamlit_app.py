@@ -1,20 +1,36 @@
 ﻿# frontend/streamlit_app.py
 from __future__ import annotations
-import json
+import copy
+import gzip
 import os
 import re
-from typing import Any, Dict, List, Optional
-
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import orjson
 import requests
 import streamlit as st
-from streamlit_drawable_canvas import st_canvas
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from urllib3.util.retry import Retry
+
+from report_stream import ReportMdDecoder
 
 # -------------------------------
 # Page config
 # -------------------------------
 st.set_page_config(page_title="Aero-AI Mission Studio", page_icon="🚀", layout="wide")
 
+@st.cache_resource
 def _default_backend_url() -> str:
+    """
+    Resolved once per server process: module scope re-executes on every Streamlit rerun,
+    so a plain global would re-read the environment and st.secrets each time.
+    """
     env = os.environ.get("BACKEND_URL")
     if env:
         return env
@@ -26,6 +42,15 @@ def _default_backend_url() -> str:
 DEFAULT_BACKEND_URL = _default_backend_url()
 TIMEOUT_S = 60
 
+# Sidebar model label -> backend model id
+_MODEL_MAP: Dict[str, str] = {
+    "OpenAI – gpt-4o-mini": "gpt-4o-mini",
+    "OpenAI – gpt-4o": "gpt-4o",
+    "OpenAI – o3-mini": "o3-mini",
+    "OpenAI – gpt-4.1": "gpt-4.1",
+}
+_MODEL_OPTIONS = tuple(_MODEL_MAP)
+
 # -------------------------------
 # Session state
 # -------------------------------
@@ -43,62 +68,184 @@ st.session_state.setdefault("last_origin", None)
 
 # canvas state (IMPORTANT: never collide with widget key)
 st.session_state.setdefault("canvas_version", 0)         # bump to clear canvas
-st.session_state.setdefault("mission_canvas_json", None) # where we store drawn JSON
+st.session_state.setdefault("_canvas_boxes", [])         # bounding boxes derived from the drawn JSON
 
 def get_backend_url() -> str:
     return (st.session_state.backend_url or DEFAULT_BACKEND_URL).rstrip("/")
 
 def _model_id_from_choice(choice: str) -> str:
-    mapping = {
-        "OpenAI – gpt-4o-mini": "gpt-4o-mini",
-        "OpenAI – gpt-4o": "gpt-4o",
-        "OpenAI – o3-mini": "o3-mini",
-        "OpenAI – gpt-4.1": "gpt-4.1",
-    }
-    return mapping.get(choice, "gpt-4o-mini")
+    return _MODEL_MAP.get(choice, "gpt-4o-mini")
 
 # -------------------------------
 # HTTP helper
 # -------------------------------
-def api_post(path: str, payload: dict, timeout: int = TIMEOUT_S) -> dict:
-    url = f"{get_backend_url()}{path}"
+@st.cache_resource
+def _http_session() -> requests.Session:
+    """
+    One keep-alive connection pool per server process. The script reruns on every
+    interaction, so a plain module-level Session would be rebuilt each time.
+    """
+    sess = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=16,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+    )
+    sess.mount("http://", adapter)
+    sess.mount("https://", adapter)
+    return sess
+
+@st.cache_resource
+def _executor() -> ThreadPoolExecutor:
+    """Shared worker pool for backend calls that can overlap with rendering."""
+    return ThreadPoolExecutor(max_workers=4)
+
+def submit(fn, *args, **kwargs) -> Future:
+    """
+    Run fn on the worker pool with this script run's context attached,
+    so Streamlit calls made by the helper (st.cache_data, st.session_state) still work.
+    """
+    ctx = get_script_run_ctx()
+
+    def _run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+
+    return _executor().submit(_run)
+
+# Bodies above this size (sketch-heavy requests) are sent gzip-compressed
+GZIP_MIN_BYTES = 1024
+
+def _encode_body(payload: dict) -> Tuple[bytes, Dict[str, str]]:
+    """Serialize once with orjson; gzip (level 1: cheap, most of the savings) when large."""
+    body = orjson.dumps(payload)
+    headers = {"Content-Type": "application/json"}
+    if len(body) > GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=1)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+def api_post(
+    path: str,
+    payload: dict,
+    timeout: int = TIMEOUT_S,
+    base_url: Optional[str] = None,
+    params: Optional[Dict[str, str]] = None,
+) -> dict:
+    url = f"{base_url or get_backend_url()}{path}"
+    body, headers = _encode_body(payload)
     try:
-        r = requests.post(url, json=payload, timeout=timeout)
+        r = _http_session().post(url, params=params, data=body, headers=headers, timeout=timeout)
         if r.status_code >= 400:
             # try to show FastAPI detail
             try:
-                j = r.json()
+                j = orjson.loads(r.content)
                 detail = j.get("detail")
                 raise RuntimeError(f"{r.status_code} {r.reason}: {detail}")
             except ValueError:
                 raise RuntimeError(f"{r.status_code} {r.reason}: {r.text}")
-        return r.json()
+        try:
+            return orjson.loads(r.content)
+        except orjson.JSONDecodeError as e:
+            raise RuntimeError(f"Invalid JSON from {url}: {e}") from e
+    except requests.RequestException as e:
+        raise RuntimeError(f"Request error calling {url}: {e}") from e
+
+def api_post_stream(
+    path: str,
+    payload: dict,
+    timeout: int = TIMEOUT_S,
+    base_url: Optional[str] = None,
+    on_event: Optional[Callable[[str, Any], None]] = None,
+    params: Optional[Dict[str, str]] = None,
+) -> Iterator[str]:
+    """
+    POST to an SSE endpoint and yield each `data:` chunk (JSON-encoded strings) until [DONE].
+    Named events other than `error` (e.g. `spec`) are passed to on_event(name, payload) instead.
+    """
+    url = f"{base_url or get_backend_url()}{path}"
+    body, headers = _encode_body(payload)
+    try:
+        with _http_session().post(url, params=params, data=body, headers=headers, timeout=timeout, stream=True) as r:
+            if r.status_code >= 400:
+                try:
+                    detail = orjson.loads(r.content).get("detail")
+                    raise RuntimeError(f"{r.status_code} {r.reason}: {detail}")
+                except ValueError:
+                    raise RuntimeError(f"{r.status_code} {r.reason}: {r.text}")
+            event: Optional[str] = None
+            lines = r.iter_lines(decode_unicode=True)
+            for line in lines:
+                if line.startswith("event: "):
+                    event = line[7:]
+                    continue
+                if not line or not line.startswith("data: "):
+                    continue
+                data = line[6:]
+                if data == "[DONE]":
+                    # Read to the end of the (already finishing) body so the keep-alive
+                    # socket goes back to the pool instead of being closed unread
+                    for _ in lines:
+                        pass
+                    return
+                chunk = orjson.loads(data)
+                if event == "error":
+                    raise RuntimeError(f"Stream error from {url}: {chunk}")
+                if event is not None:
+                    if on_event is not None:
+                        on_event(event, chunk)
+                    event = None
+                    continue
+                yield chunk
     except requests.RequestException as e:
         raise RuntimeError(f"Request error calling {url}: {e}") from e
 
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def _api_post_cached(path: str, body_json: str, base_url: Optional[str]) -> dict:
+    return api_post(path, orjson.loads(body_json), base_url=base_url)
+
+def api_post_cached(path: str, payload: dict, base_url: Optional[str] = None) -> dict:
+    """
+    api_post() for requests whose answer only depends on the body: memoized across
+    reruns/sessions on (path, sorted body JSON, backend URL). Only parsed JSON is cached; errors are not.
+    """
+    body_json = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS).decode()
+    return _api_post_cached(path, body_json, base_url)
+
 # -------------------------------
 # Small utils
 # -------------------------------
+_FENCE_START = re.compile(r"^```(?:json)?\s*")
+_FENCE_END = re.compile(r"\s*```$")
+
 def strip_code_fences(s: str) -> str:
     s = s.strip()
     if s.startswith("```"):
-        s = re.sub(r"^```(?:json)?\s*", "", s)
-        s = re.sub(r"\s*```$", "", s)
+        s = _FENCE_END.sub("", _FENCE_START.sub("", s))
     return s.strip()
 
 def try_json(s: str) -> Optional[dict]:
+    """Parse the outermost {...} span, so JSON wrapped in prose is still recovered."""
+    i = s.find("{")
+    j = s.rfind("}")
+    if i < 0 or j <= i:
+        return None
     try:
-        return json.loads(s)
-    except Exception:
+        return orjson.loads(s[i:j + 1])
+    except orjson.JSONDecodeError:
         return None
 
+# Override key -> cast; the first three are forwarded to /specs/estimate as EstimateOverrides
+_COERCE: Tuple[Tuple[str, type], ...] = (
+    ("force_stages", int),
+    ("min_diameter_m", float),
+    ("target_payload_leo_kg", float),
+    ("scale_m_per_px", float),
+)
+_ESTIMATE_OVERRIDE_KEYS = frozenset(k for k, _ in _COERCE[:3])
+
 def coerce_overrides(obj: dict) -> dict:
-    o = {}
-    if "force_stages" in obj: o["force_stages"] = int(obj["force_stages"])
-    if "min_diameter_m" in obj: o["min_diameter_m"] = float(obj["min_diameter_m"])
-    if "target_payload_leo_kg" in obj: o["target_payload_leo_kg"] = float(obj["target_payload_leo_kg"])
-    if "scale_m_per_px" in obj: o["scale_m_per_px"] = float(obj["scale_m_per_px"])
-    return o
+    return {k: cast(obj[k]) for k, cast in _COERCE if k in obj}
 
 def default_overrides() -> dict:
     return {
@@ -108,121 +255,190 @@ def default_overrides() -> dict:
         "scale_m_per_px": 0.05,
     }
 
+_BOX_KEYS = ("left", "top", "width", "height")
+_BOX_FIELDS = itemgetter(*_BOX_KEYS)
 def fallback_boxes_from_canvas_json(canvas_json: dict) -> List[dict]:
-    boxes = []
+    """
+    Bounding boxes of the drawn objects. Runs on every rerun while the board is shown,
+    so it touches only the four geometry fields (never the freedraw point arrays).
+    """
+    boxes: List[dict] = []
     if not canvas_json:
         return boxes
-    objs = canvas_json.get("objects") or []
-    for o in objs:
-        left = o.get("left"); top = o.get("top")
-        width = o.get("width"); height = o.get("height")
+    for o in canvas_json.get("objects") or []:
+        try:
+            left, top, width, height = _BOX_FIELDS(o)
+        except KeyError:
+            continue
         if left is not None and top is not None and width and height:
-            boxes.append({
-                "left": float(left),
-                "top": float(top),
-                "width": float(width),
-                "height": float(height)
-            })
+            boxes.append({"left": float(left), "top": float(top), "width": float(width), "height": float(height)})
     return boxes
 
+# Default two-stage stack (booster 240 px, upper stage 65% of that) when fewer than two boxes are drawn
+_BASE_W, _BASE_H = 90.0, 240.0
+_TWO_STAGE_TEMPLATE: Tuple[Tuple[Tuple[str, float], ...], ...] = (
+    (("left", 120.0), ("top", 60.0), ("width", _BASE_W), ("height", _BASE_H)),
+    (("left", 120.0), ("top", 60.0 + _BASE_H), ("width", _BASE_W), ("height", _BASE_H * 0.65)),
+)
+
 def ensure_two_stage_boxes(boxes: List[dict]) -> List[dict]:
     if len(boxes) >= 2:
         return boxes[:2]
-    base_w, base_h = 90.0, 240.0
-    return [
-        {"left": 120.0, "top": 60.0, "width": base_w, "height": base_h},
-        {"left": 120.0, "top": 60.0 + base_h, "width": base_w, "height": base_h * 0.65},
-    ]
+    return [dict(box) for box in _TWO_STAGE_TEMPLATE]
+
+_TARGET_RE = re.compile(r"\b(moon|tli|lunar)\b", re.I)
+_ORIGIN_RE = re.compile(
+    r"\b(ohio|michigan|louisiana|florida|texas|california|alaska|virginia|new mexico|alabama|colorado)\b", re.I
+)
 
 def _simple_text_parse(user_text: str) -> dict:
-    t = user_text.lower()
     out = {}
-    if any(k in t for k in ("moon", "tli", "lunar")):
+    if _TARGET_RE.search(user_text):
         out["_target"] = "TLI"
-    states = ["ohio","michigan","louisiana","florida","texas","california","alaska","virginia","new mexico","alabama","colorado"]
-    for s in states:
-        if s in t:
-            out["_origin_hint"] = s.title()
-            break
+    m = _ORIGIN_RE.search(user_text)
+    if m:
+        out["_origin_hint"] = m.group(1).title()
     return out
 
 # -------------------------------
 # LLM calls
 # -------------------------------
-def llm_overrides_from_text(user_text: str, model_choice: str) -> dict:
-    prompt = f"""
-You extract mission intent and design hints from a user's request.
-Model hint: {model_choice}
-
-User text:
-{user_text}
-
-Return ONLY JSON with keys (all optional): 
-{{
-  "force_stages": <int 1..3>,
-  "min_diameter_m": <float>,
-  "target_payload_leo_kg": <float>,
-  "scale_m_per_px": <float>,
-  "target": "LEO" | "TLI",
-  "origin_hint": <string>
-}}
-Do not write any explanations; ONLY JSON.
-"""
+# Key schema on one compact line: the pretty-printed version cost extra prompt tokens on every call
+_OVERRIDES_PROMPT = (
+    "You extract mission intent and design hints from a user's request.\n"
+    "Model hint: {model_id}\n\n"
+    "User text:\n{user_text}\n\n"
+    "Return ONLY JSON with keys (all optional): "
+    '{{"force_stages":<int 1..3>,"min_diameter_m":<float>,"target_payload_leo_kg":<float>,'
+    '"scale_m_per_px":<float>,"target":"LEO"|"TLI","origin_hint":<string>}}\n'
+    "Do not write any explanations; ONLY JSON."
+)
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def _llm_overrides_raw(user_text: str, model_id: str, backend_url: str) -> dict:
+    """
+    Model-extracted hints for user_text, memoized across reruns and users on (text, model, backend URL).
+    Failures raise, so they are never cached.
+    """
+    prompt = _OVERRIDES_PROMPT.format(model_id=model_id, user_text=user_text)
+    res = api_post(
+        "/ai/chat",
+        {
+            "prompt": prompt,
+            "temperature": 0.2,
+            "model": model_id,
+        },
+        base_url=backend_url,
+    )
+    txt = strip_code_fences(res.get("text", "")).strip()
+    return try_json(txt) or {}
+
+_DIGIT_RE = re.compile(r"\d")
+
+def llm_overrides_from_text(user_text: str, model_id: str, base_url: Optional[str] = None) -> dict:
+    parsed = {k: v for k, v in _simple_text_parse(user_text).items() if v}
+    base = default_overrides()
+    # Fast path: target and origin are already explicit and there are no numbers for the model
+    # to turn into payload/diameter/stage hints, so skip the LLM round-trip entirely.
+    if parsed.get("_target") and parsed.get("_origin_hint") and not _DIGIT_RE.search(user_text):
+        base.update(parsed)
+        return base
     try:
-        res = api_post(
-            "/ai/chat",
-            {
-                "prompt": prompt,
-                "temperature": 0.2,
-                "model": _model_id_from_choice(model_choice),
-            },
-        )
-        txt = strip_code_fences(res.get("text", "")).strip()
-        data = try_json(txt) or {}
+        data = _llm_overrides_raw(user_text, model_id, base_url or get_backend_url())
     except Exception:
         data = {}
-    base = default_overrides()
     base.update(coerce_overrides(data))
     if isinstance(data.get("target"), str):
         base["_target"] = data["target"].strip().upper()
     if isinstance(data.get("origin_hint"), str):
         base["_origin_hint"] = data["origin_hint"].strip()
-    base.update({k: v for k, v in _simple_text_parse(user_text).items() if v})
+    base.update(parsed)
     return base
 
-def estimate_spec(sketch_boxes: List[dict], overrides: dict) -> dict:
+def _estimate_body(sketch_boxes: List[dict], overrides: dict) -> dict:
     sketch = {"objects": len(sketch_boxes), "bounding_boxes": sketch_boxes}
-    body = {
+    return {
         "scale_m_per_px": float(overrides.get("scale_m_per_px", 0.05)),
         "sketch": sketch,
         "overrides": {k: v for k, v in overrides.items()
-                      if k in ("force_stages", "min_diameter_m", "target_payload_leo_kg")}
+                      if k in _ESTIMATE_OVERRIDE_KEYS}
     }
-    return api_post("/specs/estimate", body)
 
-def compose_concept(spec: dict, target: str, origin_hint: Optional[str], model_choice: str) -> dict:
-    body = {
-        "spec": spec,
-        "target": target,
-        "origin_hint": origin_hint,
-        "kb_hits": [],
-        "model": _model_id_from_choice(model_choice),
-    }
-    return api_post("/concept/compose_from_spec?mode=pure_ai", body)
+# Query string for the compose endpoint (encoded by requests, not hand-built into the path)
+_COMPOSE_STREAM_PARAMS = {"mode": "pure_ai", "stream": "true"}
+
+CONCEPT_CACHE_TTL_S = 3600
+CONCEPT_CACHE_MAX = 256
+
+@st.cache_resource
+def _concept_cache() -> Tuple[threading.Lock, "OrderedDict[str, Tuple[float, dict]]"]:
+    """Process-wide LRU of composed concepts (shared across sessions, like st.cache_data)."""
+    return threading.Lock(), OrderedDict()
+
+def concept_cache_key(base_url: str, path: str, body: dict) -> str:
+    """Canonical key for a compose request: backend URL, endpoint and the sorted request body (incl. model)."""
+    return base_url + path + orjson.dumps(body, option=orjson.OPT_SORT_KEYS).decode()
+
+def concept_cache_get(key: str) -> Optional[dict]:
+    lock, data = _concept_cache()
+    with lock:
+        hit = data.get(key)
+        if hit is None:
+            return None
+        ts, concept = hit
+        if time.time() - ts > CONCEPT_CACHE_TTL_S:
+            del data[key]
+            return None
+        data.move_to_end(key)
+    return copy.deepcopy(concept)
+
+def concept_cache_put(key: str, concept: dict) -> None:
+    lock, data = _concept_cache()
+    with lock:
+        data[key] = (time.time(), copy.deepcopy(concept))
+        data.move_to_end(key)
+        while len(data) > CONCEPT_CACHE_MAX:
+            data.popitem(last=False)
+
+def estimate_and_compose_body(
+    sketch_boxes: List[dict], overrides: dict, target: str, origin_hint: Optional[str], model_id: str
+) -> dict:
+    body = _estimate_body(sketch_boxes, overrides)
+    body.update(target=target, origin_hint=origin_hint, kb_hits=[], model=model_id)
+    return body
+
+def estimate_and_compose_stream(
+    body: dict, on_event: Callable[[str, Any], None], base_url: Optional[str] = None
+) -> Iterator[str]:
+    """
+    /specs/estimate + /concept/compose_from_spec in one round-trip: yields raw concept-JSON
+    text deltas for live display. on_event("spec", spec) fires once the backend has estimated
+    the spec, and on_event("concept", concept) with the finalized concept at the end.
+    """
+    return api_post_stream(
+        "/concept/estimate_and_compose", body,
+        base_url=base_url, on_event=on_event, params=_COMPOSE_STREAM_PARAMS,
+    )
 
-def ask_advisor(question: str, spec: dict, target: str, concept: Optional[dict], model_choice: str) -> dict:
+def ask_advisor(
+    question: str, spec: dict, target: str, concept: Optional[dict], model_id: str, base_url: Optional[str] = None
+) -> dict:
     body = {
         "question": question,
         "spec": spec,
         "target": target,
         "concept": concept,
         "style": "teacher",
-        "model": _model_id_from_choice(model_choice),
+        "model": model_id,
     }
-    return api_post("/advisor/ask", body)
+    return api_post_cached("/advisor/ask", body, base_url=base_url)
+
+_KV_PREFIX = "<div style='display:flex;justify-content:space-between'><span style='opacity:0.7'>"
+_KV_MID = "</span><strong>"
+_KV_SUFFIX = "</strong></div>"
 
 def card_kv(label: str, value: Any) -> str:
-    return f"<div style='display:flex;justify-content:space-between'><span style='opacity:0.7'>{label}</span><strong>{value}</strong></div>"
+    return f"{_KV_PREFIX}{label}{_KV_MID}{value}{_KV_SUFFIX}"
 
 def money(n: Optional[float]) -> str:
     try:
@@ -230,10 +446,35 @@ def money(n: Optional[float]) -> str:
     except Exception:
         return "-"
 
+def bom_frame(items: List[dict]) -> "pd.DataFrame":
+    """BoM items as a display frame (Arrow-friendly string columns) for st.dataframe."""
+    import pandas as pd  # only needed once a concept with a BoM is rendered
+
+    # Columns are built from the records, not a from_records frame: a missing qty would
+    # turn the column float64 and show "2.0" where the item said 2
+    return pd.DataFrame({
+        "Item": [str(it.get("item", "?")) for it in items],
+        "Qty": [str(it.get("qty", "—")) for it in items],
+        "UoM": [str(it.get("uom", "—")) for it in items],
+        "Est. Cost": [money(it.get("est_cost")) for it in items],
+    })
+
+def concept_summary_html(concept: dict) -> str:
+    bom = concept.get("bom") or {}
+    return "".join((
+        card_kv("Launch sites", len(concept.get("launch_sites", []))),
+        card_kv("Lunar sites", len(concept.get("lunar_sites", []))),
+        card_kv("BoM total", money(bom.get("total_est_cost"))),
+    ))
+
 # -------------------------------
 # Sidebar
 # -------------------------------
-with st.sidebar:
+# Sidebar interactions (URL / model) rerun only this fragment, not the canvas and chat below
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda fn: fn)
+
+@_fragment
+def _sidebar() -> None:
     st.markdown("## ⚙️ Settings")
     st.text_input("Backend URL", value=st.session_state.backend_url, key="backend_url_box", help="FastAPI base URL")
     if st.button("Use URL"):
@@ -242,17 +483,8 @@ with st.sidebar:
 
     st.selectbox(
         "Model",
-        options=[
-            "OpenAI – gpt-4o-mini",
-            "OpenAI – gpt-4o",
-            "OpenAI – o3-mini",
-            "OpenAI – gpt-4.1"
-        ],
-        index=[
-            "OpenAI – gpt-4o-mini","OpenAI – gpt-4o","OpenAI – o3-mini","OpenAI – gpt-4.1"
-        ].index(st.session_state.model_choice) if st.session_state.model_choice in [
-            "OpenAI – gpt-4o-mini","OpenAI – gpt-4o","OpenAI – o3-mini","OpenAI – gpt-4.1"
-        ] else 0,
+        options=_MODEL_OPTIONS,
+        index=_MODEL_OPTIONS.index(st.session_state.model_choice) if st.session_state.model_choice in _MODEL_MAP else 0,
         key="model_choice",
         help="Select the LLM used by the backend.",
     )
@@ -262,11 +494,13 @@ with st.sidebar:
     st.caption("Type: *Create a mission to deliver a 250 kg probe to the Moon from Michigan.*")
     st.caption("Or use the canvas: draw rectangles for stages, add notes like 'Ohio' and an arrow to 'Moon'.")
 
+with st.sidebar:
+    _sidebar()
+
 # -------------------------------
 # Header
 # -------------------------------
-st.markdown(
-    """
+_HEADER_HTML = """
     <style>
       .canvas-frame {border:1px solid #334155; border-radius:10px; padding:8px; background:#0b1220;}
     </style>
@@ -274,9 +508,8 @@ st.markdown(
       <div style="font-size:28px">🚀 Aero-AI Mission Studio</div>
       <div style="opacity:0.7">one input, optional sketch — AI composes the rest</div>
     </div>
-    """,
-    unsafe_allow_html=True,
-)
+    """
+st.markdown(_HEADER_HTML, unsafe_allow_html=True)
 st.markdown("")
 
 # -------------------------------
@@ -312,6 +545,8 @@ with st.expander("✏️ Doodle board (optional)"):
         st.markdown('<div class="canvas-frame">', unsafe_allow_html=True)
         # Unique widget key includes version AND size so it refreshes on resize/clear
         widget_key = f"mission_canvas_widget_v{st.session_state.canvas_version}_{canvas_w}x{canvas_h}"
+        # Imported here (cached by Python after the first run) so the header and sidebar paint first
+        from streamlit_drawable_canvas import st_canvas
         canvas_result = st_canvas(
             fill_color="rgba(0, 0, 0, 0)",
             stroke_width=3,
@@ -327,14 +562,18 @@ with st.expander("✏️ Doodle board (optional)"):
         if not (canvas_result and canvas_result.json_data and canvas_result.json_data.get("objects")):
             st.caption("Canvas is empty — click and drag to draw.")
         st.markdown("</div>", unsafe_allow_html=True)
-        # Save JSON under a state key DIFFERENT from the widget key to avoid Streamlit collisions
+        # Keep only the derived boxes in session state, not the raw stroke JSON, under a key
+        # DIFFERENT from the widget key to avoid Streamlit collisions. Deriving them reads four
+        # fields per object; the freedraw point arrays are never serialized or hashed.
         if canvas_result is not None:
-            st.session_state["mission_canvas_json"] = canvas_result.json_data
+            boxes = fallback_boxes_from_canvas_json(canvas_result.json_data)
+            if boxes != st.session_state.get("_canvas_boxes"):
+                st.session_state["_canvas_boxes"] = boxes
     with c[1]:
         use_sketch = st.button("Use sketch")
         if st.button("Clear"):
             st.session_state.canvas_version += 1
-            st.session_state.mission_canvas_json = None
+            st.session_state._canvas_boxes = []
             st.rerun()
 
 
@@ -345,16 +584,10 @@ for msg in st.session_state.history:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
         if msg.get("concept"):
-            concept = msg["concept"]
-            bom = concept.get("bom") or {}
-            total = bom.get("total_est_cost")
+            # Rendered once when the message was appended; messages are immutable afterwards
+            summary_html = msg.get("_summary_html") or concept_summary_html(msg["concept"])
             st.markdown("**Concept summary**")
-            st.markdown(
-                card_kv("Launch sites", len(concept.get("launch_sites", []))) +
-                card_kv("Lunar sites", len(concept.get("lunar_sites", []))) +
-                card_kv("BoM total", money(total)),
-                unsafe_allow_html=True
-            )
+            st.markdown(summary_html, unsafe_allow_html=True)
 
 # -------------------------------
 # Input or Use-sketch trigger
@@ -367,6 +600,24 @@ should_run = bool(user_text) or run_from_sketch
 if should_run:
     effective_text = user_text or "Create a concept from the sketch. Infer origin/target from sketch labels if present; otherwise choose sensible defaults."
 
+    # Resolved once per run and handed to every backend call below
+    backend_url = get_backend_url()
+    model_id = _model_id_from_choice(st.session_state.model_choice)
+
+    # Follow-up question on the last concept: only the advisor is needed, so skip
+    # inference/estimate/compose and answer against the stored spec + concept
+    is_followup = (
+        effective_text.strip().endswith("?")
+        and st.session_state.last_concept is not None
+        and not run_from_sketch
+    )
+
+    # 1) LLM infers parameters; started before anything is rendered so the call (the long pole)
+    #    overlaps the user message and sketch preparation
+    ov_future: Optional[Future] = None
+    if not is_followup:
+        ov_future = submit(llm_overrides_from_text, effective_text, model_id, base_url=backend_url)
+
     # Show user msg
     st.session_state.history.append({"role": "user", "content": effective_text})
     with st.chat_message("user"):
@@ -374,47 +625,79 @@ if should_run:
         if run_from_sketch and not user_text:
             st.caption("Using sketch only (no text).")
 
-    # 1) LLM infers parameters
+    if is_followup:
+        concept = st.session_state.last_concept
+        with st.chat_message("assistant"):
+            try:
+                with st.spinner("Asking the advisor…"):
+                    advisor = ask_advisor(
+                        effective_text, st.session_state.last_spec, st.session_state.last_target, concept,
+                        model_id=model_id, base_url=backend_url,
+                    )
+            except Exception as e:
+                st.error(f"Advisor failed: {e}")
+                st.stop()
+            answer_md = (advisor.get("answer") or {}).get("answer_md", "")
+            summary_html = concept_summary_html(concept)
+            st.markdown(answer_md)
+            st.markdown("**Concept summary**")
+            st.markdown(summary_html, unsafe_allow_html=True)
+        st.session_state.history.append({
+            "role": "assistant",
+            "content": answer_md,
+            "concept": concept,
+            "_summary_html": summary_html,
+        })
+        st.stop()
+
+    # 2) Sketch boxes (parsed when the canvas changed; see the Doodle board block)
+    sketch_boxes: List[dict] = st.session_state.get("_canvas_boxes") or []
+    if not sketch_boxes:
+        sketch_boxes = ensure_two_stage_boxes(sketch_boxes)
+
     with st.spinner("Inferring mission parameters with AI…"):
-        ov = llm_overrides_from_text(effective_text, st.session_state.model_choice)
+        ov = ov_future.result()
 
     target = ov.get("_target", st.session_state.last_target) or "LEO"
     origin_hint = ov.get("_origin_hint", st.session_state.last_origin)
 
-    # 2) Sketch boxes
-    sketch_boxes: List[dict] = []
-    canvas_json = st.session_state.get("mission_canvas_json")
-    if canvas_json:
-        sketch_boxes = fallback_boxes_from_canvas_json(canvas_json)
-    if not sketch_boxes:
-        sketch_boxes = ensure_two_stage_boxes(sketch_boxes)
-
-    # 3) Estimate spec
+    # 3+4) Estimate spec and compose concept in one backend round-trip, streaming the report
+    #      into the assistant message as it is generated (repeat requests are served from the concept cache)
+    assistant_box = st.chat_message("assistant")
+    with assistant_box:
+        report_ph = st.empty()
     try:
-        spec = estimate_spec(sketch_boxes, ov)
+        body = estimate_and_compose_body(sketch_boxes, ov, target, origin_hint, model_id)
+        concept_key = concept_cache_key(backend_url, "/concept/estimate_and_compose", body)
+        hit = concept_cache_get(concept_key)
+        if hit is not None:
+            spec, concept = hit["spec"], hit["concept"]
+        else:
+            streamed: Dict[str, dict] = {}
+            report_decoder = ReportMdDecoder()
+            shown = ""
+            for delta in estimate_and_compose_stream(
+                body, on_event=lambda name, payload: streamed.update({name: payload}), base_url=backend_url
+            ):
+                piece = report_decoder.feed(delta)
+                if piece:
+                    shown += piece
+                    report_ph.markdown(shown)
+            spec, concept = streamed["spec"], streamed["concept"]
+            concept_cache_put(concept_key, {"spec": spec, "concept": concept})
         st.session_state.last_spec = spec
-    except Exception as e:
-        with st.chat_message("assistant"):
-            st.error(f"Failed to estimate spec: {e}")
-        st.stop()
-
-    # 4) Compose concept
-    try:
-        concept = compose_concept(
-            spec, target=target, origin_hint=origin_hint,
-            model_choice=st.session_state.model_choice
-        )
         st.session_state.last_concept = concept
         st.session_state.last_target = target
         st.session_state.last_origin = origin_hint
     except Exception as e:
-        with st.chat_message("assistant"):
+        with report_ph.container():
             st.error(f"Compose failed: {e}")  # shows FastAPI 'detail' if present
         st.stop()
 
     # 5) If concept looks empty, auto-ask Advisor for alternatives
     empty_concept = (len(concept.get("launch_sites", [])) == 0 and len(concept.get("lunar_sites", [])) == 0)
     advisor_answer = None
+    advisor_future: Optional[Future] = None
     if empty_concept:
         try:
             fallback_q = (
@@ -422,30 +705,30 @@ if should_run:
                 f"Suggest a feasible alternative plan, explain constraints (e.g., launch sites near origin), "
                 f"and propose concrete next actions."
             )
-            advisor = ask_advisor(fallback_q, spec, target, concept, model_choice=st.session_state.model_choice)
+            advisor = ask_advisor(fallback_q, spec, target, concept, model_id=model_id, base_url=backend_url)
             advisor_answer = advisor.get("answer")
         except Exception:
             advisor_answer = None
     else:
         if effective_text.strip().endswith("?"):
-            try:
-                advisor = ask_advisor(effective_text, spec, target, concept, model_choice=st.session_state.model_choice)
-                advisor_answer = advisor.get("answer")
-            except Exception:
-                advisor_answer = None
+            # Independent of the concept rendering below; collected just before the advisor block
+            advisor_future = submit(
+                ask_advisor, effective_text, spec, target, concept, model_id=model_id, base_url=backend_url
+            )
 
-    # 6) Render assistant reply
-    with st.chat_message("assistant"):
+    # 6) Render assistant reply (the streamed report placeholder gets its final content)
+    with assistant_box:
         report_md = concept.get("report_md")
 
         if empty_concept and advisor_answer:
-            st.warning("Initial concept looked non-viable. Here’s a guided alternative:")
-            st.markdown(advisor_answer.get("answer_md", ""))
+            with report_ph.container():
+                st.warning("Initial concept looked non-viable. Here’s a guided alternative:")
+                st.markdown(advisor_answer.get("answer_md", ""))
         else:
             if report_md:
-                st.markdown(report_md)
+                report_ph.markdown(report_md)
             else:
-                st.markdown("**Concept created.**")
+                report_ph.markdown("**Concept created.**")
 
         # KPIs
         bom = concept.get("bom") or {}
@@ -487,16 +770,24 @@ if should_run:
 
         if bom.get("items"):
             st.subheader("Bill of Materials (concept level)")
-            st.table([
-                {"Item": it.get("item","?"), "Qty": it.get("qty","—"), "UoM": it.get("uom","—"), "Est. Cost": money(it.get("est_cost"))}
-                for it in bom.get("items", [])
-            ])
+            st.dataframe(bom_frame(bom["items"]), hide_index=True, use_container_width=True)
             st.markdown(f"**Total (est.)**: {money(bom.get('total_est_cost'))}  \n_Uncertainty_: {bom.get('uncertainty','—')}")
 
+        if advisor_future is not None:
+            try:
+                with st.spinner("Asking the advisor…"):
+                    advisor_answer = advisor_future.result(timeout=TIMEOUT_S).get("answer")
+            except Exception:
+                advisor_answer = None
+            if advisor_answer:
+                st.subheader("Advisor")
+                st.markdown(advisor_answer.get("answer_md", ""))
+
     st.session_state.history.append({
         "role": "assistant",
         "content": (advisor_answer or {}).get("answer_md") if empty_concept else (concept.get("report_md") or "Concept created."),
-        "concept": concept
+        "concept": concept,
+        "_summary_html": concept_summary_html(concept),
     })
-
-    st.rerun()
+    # No st.rerun(): both messages are already on screen from this run, and the next
+    # interaction renders them from history without re-running the canvas an extra time.